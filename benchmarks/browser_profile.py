@@ -0,0 +1,131 @@
+"""Compare page loads of a local static fixture site with request blocking off and on.
+
+Run from the repository root:
+
+    python -m benchmarks.browser_profile --runs 5
+
+The fixture page references images, a font, a video, a stylesheet, a script and tracker scripts on the
+blocked ad/analytics domains. Every host name resolves to the local fixture server, so no request leaves
+the machine, and each request is delayed by --latency ms to stand in for the network.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from tools.browser.browser_profile import BrowserProfile, TRACKER_DOMAINS
+
+
+def write_fixture(directory: str, port: int, images: int = 40):
+    """Generate the fixture site: an article page and the resources it loads"""
+    with open(os.path.join(directory, "image.jpg"), "wb") as file:
+        file.write(os.urandom(200_000))
+    with open(os.path.join(directory, "font.woff2"), "wb") as file:
+        file.write(os.urandom(100_000))
+    with open(os.path.join(directory, "video.mp4"), "wb") as file:
+        file.write(os.urandom(1_000_000))
+    with open(os.path.join(directory, "style.css"), "w") as file:
+        file.write("@font-face { font-family: Fixture; src: url(font.woff2); } body { font-family: Fixture; }")
+    with open(os.path.join(directory, "app.js"), "w") as file:
+        file.write("document.querySelector('#status').textContent = 'loaded';")
+    with open(os.path.join(directory, "tracker.js"), "w") as file:
+        file.write("window.__tracked = (window.__tracked || 0) + 1;")
+
+    trackers = "\n".join(f'<script src="http://{domain}:{port}/tracker.js"></script>' for domain in TRACKER_DOMAINS[:8])
+    pictures = "\n".join(f'<img src="image.jpg?{i}" width="200" height="150">' for i in range(images))
+    paragraphs = "\n".join(f"<p>Paragraph {i} of the fixture article, with a <a href='#p{i}'>link</a>.</p>"
+                           for i in range(50))
+    with open(os.path.join(directory, "index.html"), "w") as file:
+        file.write(f"""<!doctype html>
+<html><head><title>Fixture article</title><link rel="stylesheet" href="style.css">{trackers}</head>
+<body><h1>Fixture article</h1><span id="status">loading</span>
+<video src="video.mp4" preload="auto"></video>
+{pictures}
+{paragraphs}
+<button>Subscribe</button><input placeholder="Search">
+<script src="app.js"></script></body></html>""")
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+    served = 0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        type(self).served += 1
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def load_page(playwright, profile: BrowserProfile, url: str) -> dict:
+    browser = await playwright.chromium.launch(**profile.launch_options(),
+                                               args=["--host-resolver-rules=MAP * 127.0.0.1"])
+    try:
+        context = await browser.new_context(**profile.context_options())
+        await profile.apply(context)
+        page = await context.new_page()
+
+        counts = {"requests": 0, "finished": 0, "failed": 0}
+        page.on("request", lambda _: counts.__setitem__("requests", counts["requests"] + 1))
+        page.on("requestfinished", lambda _: counts.__setitem__("finished", counts["finished"] + 1))
+        page.on("requestfailed", lambda _: counts.__setitem__("failed", counts["failed"] + 1))
+
+        started = time.perf_counter()
+        await page.goto(url, wait_until="load")
+        counts["load_ms"] = (time.perf_counter() - started) * 1000
+        counts["heap_mb"] = await page.evaluate(
+            "performance.memory ? performance.memory.usedJSHeapSize / 1e6 : 0") if profile.javascript_enabled else 0
+        return counts
+    finally:
+        await browser.close()
+
+
+async def run(runs: int, latency_ms: float):
+    from playwright.async_api import async_playwright
+
+    with tempfile.TemporaryDirectory() as directory:
+        handler = partial(FixtureHandler, directory=directory)
+        FixtureHandler.latency = latency_ms / 1000
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        port = server.server_address[1]
+        write_fixture(directory, port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        profiles = {
+            "default": BrowserProfile(headless=True),
+            "blocking": BrowserProfile(headless=True, block_resources=True),
+            "blocking, no js": BrowserProfile(headless=True, block_resources=True, javascript_enabled=False),
+        }
+        try:
+            async with async_playwright() as playwright:
+                print(f"{'profile':<16} {'load ms':>9} {'requests':>9} {'finished':>9} {'blocked':>8} "
+                      f"{'served':>7} {'heap MB':>8}")
+                for name, profile in profiles.items():
+                    results = []
+                    for _ in range(runs):
+                        served_before = FixtureHandler.served
+                        counts = await load_page(playwright, profile, f"http://127.0.0.1:{port}/index.html")
+                        counts["served"] = FixtureHandler.served - served_before
+                        results.append(counts)
+
+                    median = {key: statistics.median(result[key] for result in results) for key in results[0]}
+                    print(f"{name:<16} {median['load_ms']:>9.0f} {median['requests']:>9.0f} "
+                          f"{median['finished']:>9.0f} {median['failed']:>8.0f} {median['served']:>7.0f} "
+                          f"{median['heap_mb']:>8.1f}")
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Page loads per profile, the median is reported")
+    parser.add_argument("--latency", type=float, default=20, help="Delay of every fixture request, in ms")
+    args = parser.parse_args()
+    asyncio.run(run(args.runs, args.latency))
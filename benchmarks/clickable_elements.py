@@ -0,0 +1,72 @@
+"""Rendering time of clickable_elements_to_string on synthetic deep and wide trees.
+
+Run from the repository root:
+
+    python -m benchmarks.clickable_elements --before 4d24989~1
+
+The deep tree nests --depth divs with a text node each and highlights every 100th. The wide tree has --width
+highlighted links under the body, each with a few spans of text. --before also renders with tools/browser/cls.py
+from a git revision (4d24989~1 is the last revision with the recursive renderer).
+"""
+import argparse
+import statistics
+import sys
+import time
+import types
+
+from benchmarks.dom_memory import load_cls
+
+
+def deep_tree(cls: types.ModuleType, depth: int):
+    root = current = cls.DOMElementNode(is_visible=True, tag_name="body")
+    for level in range(depth):
+        element = cls.DOMElementNode(is_visible=True, tag_name="div", parent=current,
+                                     highlight_index=level if level % 100 == 0 else None)
+        element.children.append(cls.DOMTextNode(is_visible=True, text=f"level {level}", parent=element))
+        current.children.append(element)
+        current = element
+    return root
+
+
+def wide_tree(cls: types.ModuleType, width: int):
+    root = cls.DOMElementNode(is_visible=True, tag_name="body")
+    for index in range(width):
+        link = cls.DOMElementNode(is_visible=True, tag_name="a", attributes={"href": f"/item/{index}"},
+                                  highlight_index=index, parent=root)
+        for part in range(5):
+            span = cls.DOMElementNode(is_visible=True, tag_name="span", parent=link)
+            span.children.append(cls.DOMTextNode(is_visible=True, text=f"part {part}", parent=span))
+            link.children.append(span)
+        root.children.append(link)
+    return root
+
+
+def measure(name: str, cls: types.ModuleType, depth: int, width: int, runs: int) -> dict:
+    timings, outputs = {}, {}
+    for shape, tree in (("deep", deep_tree(cls, depth)), ("wide", wide_tree(cls, width))):
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            outputs[shape] = tree.clickable_elements_to_string(["title", "href"])
+            samples.append(time.perf_counter() - started)
+        timings[shape] = statistics.median(samples)
+
+    print(f"{name:<16} {timings['deep'] * 1000:>12.1f} {timings['wide'] * 1000:>12.1f}")
+    return outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depth", type=int, default=3000)
+    parser.add_argument("--width", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=3, help="Renderings timed per tree, the median is reported")
+    parser.add_argument("--before", metavar="REVISION", help="Git revision to compare against")
+    args = parser.parse_args()
+
+    print(f"{'cls.py':<16} {'deep ms':>12} {'wide ms':>12}")
+    outputs = measure("working tree", load_cls(), args.depth, args.width, args.runs)
+    if args.before:
+        # The recursive renderer recurses per tree level, and so do the dataclass comparisons it makes
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), args.depth * 10))
+        before = measure(args.before, load_cls(args.before), args.depth, args.width, args.runs)
+        print("same output" if before == outputs else "OUTPUT DIFFERS")
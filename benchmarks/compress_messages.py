@@ -0,0 +1,72 @@
+"""Per-step latency of compress_messages on agent histories of 50, 200 and 1000 messages.
+
+Run from the repository root:
+
+    python -m benchmarks.compress_messages
+
+A step appends one message and compresses the history, reusing the token ledger and view cache across steps
+like reasoning_node does. The cold column is the first compression of a history with an empty ledger and cache.
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from util import CompressedViewCache, TokenLedger, compress_messages
+
+# Same settings as reasoning_node in sisyphus.py, which is not imported for its storage side effects
+COMPRESSION_POLICY = {"tool": 1024, "human": 1024, "ai": 1025}
+MAX_TOKENS = 12800
+
+WORDS = "the page lists results for the query with links prices and reviews of each item".split()
+
+
+def text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def message(rng: random.Random, position: int):
+    """Messages in the shape of an agent run: tool calls, their (often large) outputs, occasional user input"""
+    if position % 10 == 0:
+        return HumanMessage(text(rng, rng.randint(20, 2000)), id=str(uuid.uuid4()))
+    if position % 2:
+        call_id = f"call_{position}"
+        return AIMessage(text(rng, rng.randint(10, 300)), id=str(uuid.uuid4()),
+                         tool_calls=[{"name": "browser_click_element", "args": {"index": position}, "id": call_id}])
+    return ToolMessage(text(rng, rng.randint(50, 5000)), tool_call_id=f"call_{position - 1}", id=str(uuid.uuid4()))
+
+
+def bench(size: int, steps: int, seed: int = 0) -> tuple:
+    rng = random.Random(seed)
+    history = [SystemMessage("You are an agent", id=str(uuid.uuid4()))]
+    history += [message(rng, position) for position in range(1, size)]
+
+    started = time.perf_counter()
+    compress_messages(history, MAX_TOKENS, COMPRESSION_POLICY, TokenLedger(), CompressedViewCache())
+    cold = time.perf_counter() - started
+
+    ledger, cache = TokenLedger(), CompressedViewCache()
+    compress_messages(history, MAX_TOKENS, COMPRESSION_POLICY, ledger, cache)
+    timings = []
+    for position in range(size, size + steps):
+        history.append(message(rng, position))
+        started = time.perf_counter()
+        compress_messages(history, MAX_TOKENS, COMPRESSION_POLICY, ledger, cache)
+        timings.append(time.perf_counter() - started)
+
+    return cold, statistics.median(timings), max(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--steps", type=int, default=50, help="Steps measured per history size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000])
+    args = parser.parse_args()
+
+    print(f"{'messages':>8} {'cold ms':>9} {'step median ms':>15} {'step max ms':>12}")
+    for size in args.sizes:
+        cold, median, worst = bench(size, args.steps)
+        print(f"{size:>8} {cold * 1000:>9.1f} {median * 1000:>15.2f} {worst * 1000:>12.2f}")
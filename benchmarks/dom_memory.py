@@ -0,0 +1,85 @@
+"""Memory and construction time of a 10k element DOM tree, optionally compared with an earlier revision.
+
+Run from the repository root:
+
+    python -m benchmarks.dom_memory --elements 10000 --before e4eeaa1~1
+
+The tree is built the way browser_api builds it from a page scan: an element node with coordinates and a text
+child per interactive element, plus their selector map and hashes. --before loads tools/browser/cls.py from a
+git revision instead of the working tree (e4eeaa1~1 is the last revision without slotted node classes).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_cls(revision: str = None) -> types.ModuleType:
+    """tools.browser.cls of the working tree, or the one at `revision`"""
+    if revision is None:
+        from tools.browser import cls
+        return cls
+
+    source = subprocess.run(["git", "show", f"{revision}:tools/browser/cls.py"], cwd=REPO_ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    module = types.ModuleType(f"cls_{revision}")
+    # dataclasses looks the defining module up in sys.modules to resolve annotations
+    sys.modules[module.__name__] = module
+    exec(compile(source, f"{revision}:tools/browser/cls.py", "exec"), module.__dict__)
+    return module
+
+
+def build(cls: types.ModuleType, elements: int):
+    viewport = cls.ViewportInfo(width=1280, height=720)
+    root = cls.DOMElementNode(is_visible=True, tag_name="body", xpath="/body", viewport_info=viewport)
+    selector_map = {}
+    for index in range(elements):
+        element = cls.DOMElementNode(
+            is_visible=True, tag_name="a", xpath=f"/body/div[{index}]/a",
+            attributes={"href": f"/item/{index}", "class": "result-link"},
+            is_interactive=True, is_top_element=True, highlight_index=index, parent=root,
+            viewport_coordinates=cls.CoordinateSet(x=10, y=index * 20, width=200, height=18),
+            page_coordinates=cls.CoordinateSet(x=10, y=index * 20, width=200, height=18),
+            viewport_info=viewport)
+        element.children.append(cls.DOMTextNode(is_visible=True, text=f"Result {index}", parent=element))
+        root.children.append(element)
+        selector_map[index] = element
+        # The diff against the previous state hashes every element
+        element.hash
+    return root, selector_map
+
+
+def measure(name: str, cls: types.ModuleType, elements: int, runs: int):
+    tracemalloc.start()
+    tree = build(cls, elements)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del tree
+
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        build(cls, elements)
+        timings.append(time.perf_counter() - started)
+
+    print(f"{name:<16} {memory / 1e6:>10.2f} {statistics.median(timings) * 1000:>10.1f} "
+          f"{memory / elements:>14.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--elements", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=5, help="Constructions timed, the median is reported")
+    parser.add_argument("--before", metavar="REVISION", help="Git revision to compare against")
+    args = parser.parse_args()
+
+    print(f"{'cls.py':<16} {'memory MB':>10} {'build ms':>10} {'bytes/element':>14}")
+    if args.before:
+        measure(args.before, load_cls(args.before), args.elements, args.runs)
+    measure("working tree", load_cls(), args.elements, args.runs)
@@ -0,0 +1,78 @@
+"""1000 get_browser_state calls over HTTP, with and without the transport's pooled keep-alive session.
+
+Run from the repository root:
+
+    python -m benchmarks.http_transport --calls 1000
+
+The browser API is stubbed by a local HTTP/1.1 server answering every action with a canned browser state, so
+only the transport is measured: unpooled calls open a new connection each, pooled ones reuse the session's.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from tools.browser.transport import HttpTransport
+
+STATE = json.dumps({
+    "success": True,
+    "message": "Retrieved current browser state",
+    "url": "https://example.com/",
+    "title": "Example Domain",
+    "elements": "\n".join(f"[{i}]<a href=\"/item/{i}\">Item {i}</a>" for i in range(50)),
+    "element_count": 50,
+}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, Nagle would hold the body back for the client's delayed ack
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STATE)))
+        self.end_headers()
+        self.wfile.write(STATE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run(calls: int):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    api_url = f"http://127.0.0.1:{server.server_address[1]}/api"
+
+    try:
+        started = time.perf_counter()
+        for _ in range(calls):
+            requests.get(f"{api_url}/automation/get_browser_state", timeout=(5, 30)).raise_for_status()
+        unpooled = time.perf_counter() - started
+
+        transport = HttpTransport(api_url=api_url, start_server=False)
+        transport.execute("get_browser_state", method="GET")
+        started = time.perf_counter()
+        for _ in range(calls):
+            transport.execute("get_browser_state", method="GET")
+        pooled = time.perf_counter() - started
+    finally:
+        server.shutdown()
+
+    print(f"unpooled {unpooled / calls * 1000:.2f} ms/call ({unpooled:.2f}s total)")
+    print(f"pooled   {pooled / calls * 1000:.2f} ms/call ({pooled:.2f}s total)")
+
+
+if __name__ == "__main__":
+    from loguru import logger
+
+    # The transport logs every call at debug level
+    logger.remove()
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    run(parser.parse_args().calls)
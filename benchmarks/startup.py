@@ -0,0 +1,76 @@
+"""Time from launching the CLI to its first LLM call, optionally compared with an earlier revision.
+
+Run from the repository root:
+
+    python -m benchmarks.startup --runs 5 --before 031c267~1
+
+Each run starts a fresh interpreter that imports sisyphus, runs initialize() and starts an agent with a fake
+chat model, which reports the time and exits on its first call. --before also measures a git revision, checked
+out into a temporary worktree (031c267~1 is the last revision with eager tool initialization).
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import os, sys, time
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+import langchain.chat_models
+
+class FirstCall(FakeListChatModel):
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, *args, **kwargs):
+        print(f"FIRST_CALL {time.time()}", flush=True)
+        os._exit(0)
+
+langchain.chat_models.init_chat_model = lambda *args, **kwargs: FirstCall(responses=[""])
+sys.argv = ["sisyphus.py", "benchmark"]
+import sisyphus
+sisyphus.initialize()
+sisyphus.gen_sisyphus(max_step=2)("benchmark")
+"""
+
+
+def time_to_first_call(source_root: str) -> float:
+    # A scratch working directory, since sisyphus opens its databases and log file under it
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {**os.environ, "PYTHONPATH": source_root, "MODEL": os.getenv("MODEL", "fake")}
+        started = time.time()
+        result = subprocess.run([sys.executable, "-c", CHILD], cwd=workdir, env=env, capture_output=True,
+                                text=True, timeout=300)
+
+    for line in result.stdout.splitlines():
+        if line.startswith("FIRST_CALL "):
+            return float(line.split()[1]) - started
+    raise RuntimeError(f"no LLM call was made:\n{result.stderr[-2000:]}")
+
+
+def measure(name: str, source_root: str, runs: int):
+    timings = [time_to_first_call(source_root) for _ in range(runs)]
+    print(f"{name:<24} median {statistics.median(timings) * 1000:>7.0f} ms   min {min(timings) * 1000:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters started per revision")
+    parser.add_argument("--before", metavar="REVISION", help="Git revision to compare against")
+    args = parser.parse_args()
+
+    if args.before:
+        with tempfile.TemporaryDirectory() as worktree:
+            subprocess.run(["git", "worktree", "add", "--detach", worktree, args.before], cwd=REPO_ROOT, check=True,
+                           capture_output=True)
+            try:
+                measure(args.before, worktree, args.runs)
+            finally:
+                subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=REPO_ROOT,
+                               capture_output=True)
+    measure("working tree", REPO_ROOT, args.runs)
@@ -1,29 +1,45 @@
+import argparse
+import asyncio
+import json
 import os
 import sys
-from typing import cast
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional, TYPE_CHECKING, cast
 
 from dotenv import load_dotenv
 
 from prompt.prompt import SYSTEM_PROMPT
-from util import compress_messages
+from util import compress_messages, TokenLedger, CompressedViewCache
 
 load_dotenv()
 
-from storage import storage
+from storage import storage, checkpointer
 
 from tools import (browser, data_provider, file, misc, shell, task, web_search)
 from loguru import logger
-from langchain.chat_models import init_chat_model
 from langchain_core.language_models import BaseChatModel
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.constants import END
 from langgraph.graph import StateGraph, MessagesState
-from langchain_core.messages import AIMessage, HumanMessage, ToolCall, SystemMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolCall, SystemMessage, \
+    message_chunk_to_message
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import ToolNode
 from langgraph.types import Command
 
 from tools import tool_registry
+from tools.util import current_goal, current_session
+
+if TYPE_CHECKING:
+    from storage.llm_cache import LLMResponseCache
+
+
+# Single-message token thresholds, compressed in this order until the history fits
+COMPRESSION_POLICY = {"tool": 1024, "human": 1024, "ai": 1025}
 
 
 class State(MessagesState):
@@ -35,37 +51,123 @@ class State(MessagesState):
 class Sisyphus:
     state: State
     graph: CompiledStateGraph
+    thread_id: str
 
-    def __init__(self, max_step: int, graph: CompiledStateGraph):
+    def __init__(self, max_step: int, graph: CompiledStateGraph, thread_id: Optional[str] = None):
         self.graph = graph
+        self.thread_id = thread_id or str(uuid.uuid4())
         self.state: State = State(
             current_step=0,
             max_step=max_step,
             messages=[SystemMessage(SYSTEM_PROMPT)]
         )
 
-    def __call__(self, query: str):
-        self.state["messages"].append(HumanMessage(query))
+    @property
+    def config(self) -> dict:
+        return {"recursion_limit": 65535, "configurable": {"thread_id": self.thread_id}}
 
-        self.graph.invoke(self.state, {"recursion_limit": 65535})
+    def __call__(self, query: str):
+        asyncio.run(self.arun(query))
 
+    async def arun(self, query: str):
+        self.state["messages"].append(HumanMessage(query))
+        # Tools keep their per-agent data under the session of the run calling them
+        current_session.set(self.thread_id)
+        current_goal.set(query)
+
+        logger.info(f"Running thread {self.thread_id}, resume it with --resume {self.thread_id}")
+        try:
+            await self.graph.ainvoke(self.state, self.config)
+        finally:
+            await self.release_browser()
+
+    def resume(self):
+        asyncio.run(self.aresume())
+
+    async def aresume(self):
+        snapshot = await self.graph.aget_state(self.config)
+        if not snapshot.values:
+            raise ValueError(f"No checkpoint found for thread {self.thread_id}")
+
+        # Continue from the last checkpoint; finished steps are not replayed
+        logger.info(f"Resuming thread {self.thread_id} at step {snapshot.values.get('current_step')}")
+        current_session.set(self.thread_id)
+        current_goal.set(next((m.content for m in snapshot.values["messages"] if isinstance(m, HumanMessage)), ""))
+        try:
+            await self.graph.ainvoke(None, self.config)
+        finally:
+            await self.release_browser()
+
+    async def release_browser(self):
+        # Until released, the run's browser context is never evicted for another run's
+        try:
+            await asyncio.to_thread(browser.release_session, self.thread_id)
+        except Exception as e:
+            logger.warning(f"Could not release the browser session of thread {self.thread_id}: {e}")
+
+
+def gen_graph(model: str, streaming: bool = False, checkpointer: Optional[BaseCheckpointSaver] = None,
+              response_cache: Optional["LLMResponseCache"] = None) -> CompiledStateGraph:
+    # Model providers are resolved (and imported) only when a graph is built
+    from langchain.chat_models import init_chat_model
 
-def gen_graph(model: str) -> CompiledStateGraph:
     tool_node = ToolNode(tools=tool_registry.tools)
     tool_classes = list(tool_node.tools_by_name.values())
+    cache_scope = response_cache.scope(model, tool_classes) if response_cache else None
     model = cast(BaseChatModel, init_chat_model(model)).bind_tools(tool_classes)
-
-    def acting_node(state: State):
+    # A compiled graph can serve several runs at once, so token accounting is kept per thread
+    ledgers: Dict[str, TokenLedger] = defaultdict(TokenLedger)
+    compressed_views = CompressedViewCache()
+    # Tool calls already started while their message was still streaming, keyed by tool call id
+    dispatched: Dict[str, asyncio.Task] = {}
+
+    def dispatch(tool_call: ToolCall) -> asyncio.Task:
+        return asyncio.create_task(tool_node.ainvoke([tool_call]))
+
+    def cancel_dispatched(tool_call_ids):
+        # Tool calls of a response that never reaches acting_node must not keep running, nor stay in `dispatched`
+        for tool_call_id in tool_call_ids:
+            task = dispatched.pop(tool_call_id, None)
+            if task is not None:
+                task.cancel()
+
+    async def stream_response(prompt) -> AIMessage:
+        message: Optional[AIMessageChunk] = None
+        started = []
+        try:
+            async for chunk in model.astream(prompt):
+                message = chunk if message is None else message + chunk
+
+                # Chunks are merged by index, so every tool call before the last one has complete arguments
+                for tool_call_chunk in message.tool_call_chunks[:-1]:
+                    tool_call_id = tool_call_chunk.get("id")
+                    if tool_call_id and tool_call_id not in dispatched:
+                        for tool_call in message.tool_calls:
+                            if tool_call["id"] == tool_call_id:
+                                logger.info(f"Dispatching {tool_call['name']} while the response is still streaming")
+                                dispatched[tool_call_id] = dispatch(tool_call)
+                                started.append(tool_call_id)
+        except BaseException:
+            cancel_dispatched(started)
+            raise
+
+        return cast(AIMessage, message_chunk_to_message(message))
+
+    async def acting_node(state: State):
         logger.info(f"Acting for step {state['current_step']}")
-        response = tool_node.invoke(state)
-        logger.info(f"Acting result:\n {response['messages'][-1]}")
+        # Tool calls of the same message run concurrently, bounded by TOOL_CONCURRENCY
+        tasks = [dispatched.pop(tool_call["id"], None) or dispatch(tool_call)
+                 for tool_call in state["messages"][-1].tool_calls]
+        responses = await asyncio.gather(*tasks)
+        tool_messages = [msg for response in responses for msg in response['messages']]
+        logger.info(f"Acting result:\n {tool_messages[-1]}")
 
         return Command(
             goto="reasoning_node",
-            update={"messages": response['messages'], "current_step": state["current_step"] + 1},
+            update={"messages": tool_messages, "current_step": state["current_step"] + 1},
         )
 
-    def reasoning_node(state: State):
+    async def reasoning_node(state: State, config: RunnableConfig):
         latest_msg = state["messages"][-1]
         if not isinstance(latest_msg, SystemMessage):
             storage.set_value(latest_msg.id, latest_msg)
@@ -80,19 +182,34 @@ def gen_graph(model: str) -> CompiledStateGraph:
         logger.info(f"Reasoning for step {state['current_step']}")
 
         messages = state["messages"]
-        messages = compress_messages(messages=messages, max_tokens=12800, single_msg_threshold=1024, target="tool")
-        messages = compress_messages(messages=messages, max_tokens=12800, single_msg_threshold=1024, target="human")
-        messages = compress_messages(messages=messages, max_tokens=12800, single_msg_threshold=1025, target="ai")
+        messages = compress_messages(messages=messages, max_tokens=12800, policy=COMPRESSION_POLICY,
+                                     ledger=ledgers[config["configurable"].get("thread_id", "")],
+                                     cache=compressed_views)
 
         prompt = ChatPromptTemplate.from_messages(messages).invoke({})
-        response = cast(AIMessage, model.invoke(prompt))
-        logger.info(f"Reasoning result:\n {response.content}")
-        storage.set_value(response.id, latest_msg)
+        cache_key = response_cache.key(cache_scope, prompt.to_messages()) if response_cache else None
+        response = response_cache.get(cache_key) if response_cache else None
+        cached = response is not None
+        if not cached:
+            if streaming:
+                response = await stream_response(prompt)
+            else:
+                response = cast(AIMessage, await model.ainvoke(prompt))
+
+        try:
+            if response_cache and not cached:
+                response_cache.set(cache_key, response)
+            logger.info(f"Reasoning result:\n {response.content}")
+            storage.set_value(response.id, latest_msg)
+        except BaseException:
+            # The response is lost with this step, so are the tool calls started while it streamed
+            cancel_dispatched(tool_call["id"] for tool_call in response.tool_calls)
+            raise
 
         if not response.tool_calls:
             return Command(
                 goto=END,
-                update={},
+                update={"messages": [response]},
             )
         else:
             return Command(
@@ -106,20 +223,91 @@ def gen_graph(model: str) -> CompiledStateGraph:
     builder.add_edge("acting_node", "reasoning_node")
 
     builder.set_entry_point("reasoning_node")
-    graph = builder.compile()
+    graph = builder.compile(checkpointer=checkpointer)
 
     return graph
 
 
-def gen_sisyphus(max_step=25) -> Sisyphus:
-    graph = gen_graph(os.getenv("MODEL"))
+def gen_default_graph() -> CompiledStateGraph:
+    response_cache = None
+    if os.getenv("LLM_CACHE", "false").lower() == "true":
+        from storage.llm_cache import LLMResponseCache
+
+        response_cache = LLMResponseCache(ttl=int(os.getenv("LLM_CACHE_TTL", "86400")),
+                                          size_limit=int(os.getenv("LLM_CACHE_SIZE_MB", "512")) * 1024 * 1024)
+
+    return gen_graph(os.getenv("MODEL"), streaming=os.getenv("STREAMING", "false").lower() == "true",
+                     checkpointer=checkpointer, response_cache=response_cache)
+
+
+def gen_sisyphus(max_step=25, thread_id: Optional[str] = None) -> Sisyphus:
+    graph = gen_default_graph()
 
     return Sisyphus(
         graph=graph,
         max_step=max_step,
+        thread_id=thread_id,
     )
 
 
+async def run_batch(queries_path: str, output_path: str, workers: int, max_step: int):
+    """Run every query of a JSONL file ({"query": ..., "id": ...} per line) on a shared graph.
+
+    Each agent keeps its own State and thread; results and timings are appended to `output_path` as they finish.
+    A malformed line gets an error row instead of stopping the batch.
+    """
+    if workers < 1:
+        # A semaphore without permits would never start any query
+        raise ValueError(f"workers must be at least 1, got {workers}")
+
+    with open(queries_path, encoding="utf-8") as f:
+        lines = [line for line in f if line.strip()]
+
+    # Every running agent keeps its browser context, so the in-process browser needs at least one per worker
+    max_contexts = int(os.getenv("BROWSER_MAX_CONTEXTS", "4"))
+    if max_contexts < workers:
+        logger.warning(f"BROWSER_MAX_CONTEXTS={max_contexts} is below the {workers} workers, raising it to {workers}")
+        os.environ["BROWSER_MAX_CONTEXTS"] = str(workers)
+
+    # One model client and one set of tools for the whole batch
+    graph = gen_default_graph()
+    semaphore = asyncio.Semaphore(workers)
+    output_lock = asyncio.Lock()
+
+    async def run_one(position: int, line: str):
+        async with semaphore:
+            sisyphus = Sisyphus(graph=graph, max_step=max_step)
+            result = {"id": position, "query": None, "thread_id": sisyphus.thread_id}
+            started = time.perf_counter()
+            try:
+                item = json.loads(line)
+                result["id"] = item.get("id", position)
+                if not isinstance(item.get("query"), str):
+                    raise ValueError('Line has no "query" string')
+                result["query"] = item["query"]
+                await sisyphus.arun(item["query"])
+                values = (await graph.aget_state(sisyphus.config)).values
+                last_message = values["messages"][-1]
+                # A run stopped by max_step ends on tool output or pending tool calls, neither is an answer
+                if isinstance(last_message, AIMessage) and not last_message.tool_calls:
+                    result.update(answer=last_message.content, steps=values["current_step"], error=None)
+                else:
+                    result.update(answer=None, steps=values["current_step"],
+                                  error=f"Ran out of steps after {values['current_step']} steps")
+            except Exception as e:
+                logger.exception(f"Batch query {result['id']} failed")
+                result.update(answer=None, steps=None, error=str(e))
+            result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+
+            async with output_lock:
+                with open(output_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            logger.info(f"Batch query {result['id']} finished in {result['elapsed_seconds']}s")
+
+    logger.info(f"Running {len(lines)} queries with {workers} workers, writing results to {output_path}")
+    await asyncio.gather(*(run_one(position, line) for position, line in enumerate(lines)))
+
+
 def initialize():
     # Remove default logger to customize it
     logger.remove()
@@ -158,17 +346,35 @@ def initialize():
 
 
 if __name__ == "__main__":
-    initialize()
+    parser = argparse.ArgumentParser(prog="sisyphus.py")
+    parser.add_argument("query", nargs="*", help="The query to solve")
+    parser.add_argument("--resume", metavar="THREAD_ID", help="Resume an interrupted run from its last checkpoint")
+    parser.add_argument("--batch", metavar="QUERIES_JSONL", help="Run every query of a JSONL file")
+    parser.add_argument("--output", default="results.jsonl", help="Where batch results are written")
+    parser.add_argument("--workers", type=int, default=4, help="Number of agents running concurrently in batch mode")
+    args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
 
     # Check if query is provided as command line arguments
-    if len(sys.argv) < 2:
-        logger.error("Usage: python sisyphus.py <query>")
+    if not args.query and not args.resume and not args.batch:
+        logger.error("Usage: python sisyphus.py <query> | --resume <thread_id> | --batch <queries.jsonl>")
         logger.info("Example: python sisyphus.py 'What is the weather today?'")
         sys.exit(1)
 
-    # Join all arguments after the script name as the query
-    query = " ".join(sys.argv[1:])
-    logger.info(f"Received query: {query}")
+    initialize()
+
+    if args.batch:
+        asyncio.run(run_batch(args.batch, args.output, args.workers, max_step=100))
+        sys.exit(0)
+
+    sisyphus = gen_sisyphus(max_step=100, thread_id=args.resume)
+
+    if args.resume:
+        sisyphus.resume()
+    else:
+        # Join all arguments after the script name as the query
+        query = " ".join(args.query)
+        logger.info(f"Received query: {query}")
 
-    sisyphus = gen_sisyphus(max_step=100)
-    sisyphus(query)
+        sisyphus(query)
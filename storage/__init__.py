@@ -1,3 +1,5 @@
+from storage.checkpoint import SqliteCheckpointSaver
 from storage.local_storage import LocalStorage
 
 storage = LocalStorage()
+checkpointer = SqliteCheckpointSaver("workspace/tmp/checkpoint.db")
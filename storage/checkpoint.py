@@ -0,0 +1,260 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata,
+                                       CheckpointTuple, WRITES_IDX_MAP, get_checkpoint_id, get_checkpoint_metadata)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    thread_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, message_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+# Blob type marking a message list stored as ids into the messages table
+_MESSAGE_IDS = "message_ids"
+
+
+def _fingerprint(msg: BaseMessage) -> int:
+    """Cheap hash of what a message says, to notice a message replaced or edited under the same id"""
+    content = msg.content if isinstance(msg.content, str) else repr(msg.content)
+    return hash((msg.type, content, repr(getattr(msg, "tool_calls", None)), repr(msg.additional_kwargs)))
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    """LangGraph checkpointer persisting to a local SQLite database.
+
+    Only channels that changed in a step are written, and message lists are stored as a list of
+    ids: every message is serialized once per thread, so a step costs the size of its delta rather
+    than the size of the whole history.
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+        # Fingerprints of the messages already persisted per thread; a message whose fingerprint changed is
+        # rewritten. Only ids and hashes are kept, so long batches do not hold on to every message.
+        self.persisted_messages: Dict[str, Dict[str, int]] = {}
+
+    def _dump_channel(self, thread_id: str, value: Any) -> Tuple[str, bytes]:
+        if not isinstance(value, list) or not value or not all(
+                isinstance(msg, BaseMessage) and msg.id for msg in value):
+            return self.serde.dumps_typed(value)
+
+        persisted = self.persisted_messages.setdefault(thread_id, {})
+        for msg in value:
+            fingerprint = _fingerprint(msg)
+            if persisted.get(msg.id) != fingerprint:
+                type_, blob = self.serde.dumps_typed(msg)
+                self.conn.execute("INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)",
+                                  (thread_id, msg.id, type_, blob))
+                persisted[msg.id] = fingerprint
+
+        return _MESSAGE_IDS, json.dumps([msg.id for msg in value]).encode()
+
+    def _load_channel(self, thread_id: str, type_: str, blob: bytes) -> Any:
+        if type_ != _MESSAGE_IDS:
+            return self.serde.loads_typed((type_, blob))
+
+        message_ids = json.loads(blob)
+        rows = self.conn.execute(
+            f"SELECT message_id, type, blob FROM messages WHERE thread_id = ? AND message_id IN "
+            f"({','.join('?' * len(message_ids))})", (thread_id, *message_ids)).fetchall()
+        messages = {message_id: self.serde.loads_typed((msg_type, msg_blob)) for message_id, msg_type, msg_blob in rows}
+
+        persisted = self.persisted_messages.setdefault(thread_id, {})
+        persisted.update((message_id, _fingerprint(msg)) for message_id, msg in messages.items())
+        return [messages[message_id] for message_id in message_ids]
+
+    def _load_channel_values(self, thread_id: str, checkpoint_ns: str,
+                             versions: ChannelVersions) -> Dict[str, Any]:
+        channel_values = {}
+        for channel, version in versions.items():
+            row = self.conn.execute(
+                "SELECT type, blob FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version))).fetchone()
+            if row and row[0] != "empty":
+                channel_values[channel] = self._load_channel(thread_id, row[0], row[1])
+        return channel_values
+
+    def _to_tuple(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_blob, metadata_type, metadata_blob = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_blob))
+        writes = self.conn.execute(
+            "SELECT task_id, channel, type, blob FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_channel_values(thread_id, checkpoint_ns,
+                                                            checkpoint["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                            "checkpoint_id": parent_checkpoint_id}}
+            if parent_checkpoint_id else None,
+            pending_writes=[(task_id, channel, self.serde.loads_typed((write_type, blob)))
+                            for task_id, channel, write_type, blob in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = ("SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                 "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?")
+        params: List[Any] = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        query += " ORDER BY checkpoint_id DESC LIMIT 1"
+
+        with self.lock:
+            row = self.conn.execute(query, params).fetchone()
+            return self._to_tuple(thread_id, checkpoint_ns, row) if row else None
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints WHERE 1 = 1")
+        params: List[Any] = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        query += " ORDER BY checkpoint_id DESC"
+
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        count = 0
+        for thread_id, checkpoint_ns, *row in rows:
+            with self.lock:
+                checkpoint_tuple = self._to_tuple(thread_id, checkpoint_ns, tuple(row))
+            if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            yield checkpoint_tuple
+            count += 1
+            if limit is not None and count >= limit:
+                break
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint = checkpoint.copy()
+        values: Dict[str, Any] = checkpoint.pop("channel_values")
+
+        with self.lock, self.conn:
+            # Only the channels updated by this step are written
+            for channel, version in new_versions.items():
+                type_, blob = self._dump_channel(thread_id, values[channel]) if channel in values else ("empty", b"")
+                self.conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                                  (thread_id, checkpoint_ns, channel, str(version), type_, blob))
+
+            type_, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+            metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+            self.conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                              (thread_id, checkpoint_ns, checkpoint["id"],
+                               config["configurable"].get("checkpoint_id"),
+                               type_, checkpoint_blob, metadata_type, metadata_blob))
+
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self.lock, self.conn:
+            for idx, (channel, value) in enumerate(writes):
+                write_idx = WRITES_IDX_MAP.get(channel, idx)
+                # Special writes (errors, interrupts) replace earlier ones; regular writes are kept once per task
+                statement = "INSERT OR REPLACE" if write_idx < 0 else "INSERT OR IGNORE"
+                type_, blob = self.serde.dumps_typed(value)
+                self.conn.execute(f"{statement} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                  (thread_id, checkpoint_ns, checkpoint_id, task_id, write_idx, channel, type_, blob,
+                                   task_path))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.lock, self.conn:
+            for table in ("checkpoints", "blobs", "messages", "writes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        self.persisted_messages.pop(thread_id, None)
+
+    # SQLite calls are short and local, so the async API runs them inline like the in-memory saver does
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.get_tuple(config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        for checkpoint_tuple in self.list(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.delete_thread(thread_id)
@@ -0,0 +1,72 @@
+import json
+import re
+import uuid
+from typing import List, Optional
+
+import xxhash
+from diskcache import Cache
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from loguru import logger
+
+# Ids of compressed messages, embedded in their content for the expand-message tool (see util.compress_message)
+_MESSAGE_ID_MARKER = re.compile(r'message_id "[^"]*"')
+
+
+class LLMResponseCache:
+    """Local cache of model responses keyed by the rendered prompt and the bound tool schemas.
+
+    Message and tool call ids are left out of the key, since they differ between otherwise identical runs;
+    so are the ids compressed messages embed in their content.
+    """
+    cache: Cache
+    ttl: Optional[int]
+    hits: int
+    misses: int
+
+    def __init__(self, directory: str = "workspace/llm_cache", ttl: Optional[int] = None,
+                 size_limit: int = 512 * 1024 * 1024):
+        self.cache = Cache(directory=directory, size_limit=size_limit, eviction_policy="least-recently-used")
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def scope(model: str, tools: List[BaseTool]) -> str:
+        schemas = [convert_to_openai_tool(t) for t in tools]
+        return xxhash.xxh3_128_hexdigest(json.dumps([model, schemas], sort_keys=True, default=str))
+
+    @staticmethod
+    def _normalize(msg: BaseMessage) -> dict:
+        content = _MESSAGE_ID_MARKER.sub('message_id ""', msg.content) if isinstance(msg.content, str) else msg.content
+        normalized = {"type": msg.type, "content": content, "name": msg.name}
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            normalized["tool_calls"] = [{"name": tc["name"], "args": tc["args"]} for tc in msg.tool_calls]
+        return normalized
+
+    def key(self, scope: str, messages: List[BaseMessage]) -> str:
+        payload = json.dumps([self._normalize(msg) for msg in messages], sort_keys=True, default=str)
+        return f"{scope}:{xxhash.xxh3_128_hexdigest(payload)}"
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        response = self.cache.get(key)
+        if response is None:
+            self.misses += 1
+            logger.info(f"LLM cache miss ({self.hits} hits / {self.misses} misses)")
+            return None
+
+        self.hits += 1
+        logger.info(f"LLM cache hit ({self.hits} hits / {self.misses} misses)")
+        # Fresh message and tool call ids keep replayed responses distinct, across threads too
+        update = {"id": f"run-{uuid.uuid4()}"}
+        if response.tool_calls:
+            ids = {tc["id"]: f"call_{uuid.uuid4().hex[:24]}" for tc in response.tool_calls}
+            update["tool_calls"] = [{**tc, "id": ids[tc["id"]]} for tc in response.tool_calls]
+            if response.additional_kwargs.get("tool_calls"):
+                update["additional_kwargs"] = {**response.additional_kwargs, "tool_calls": [
+                    {**tc, "id": ids.get(tc.get("id"), tc.get("id"))} for tc in response.additional_kwargs["tool_calls"]]}
+        return response.model_copy(update=update)
+
+    def set(self, key: str, response: AIMessage):
+        self.cache.set(key, response, expire=self.ttl)
@@ -0,0 +1,19 @@
+import os
+import shutil
+import tempfile
+
+_original_cwd = None
+_workdir = None
+
+
+def pytest_configure(config):
+    # The storage package opens its databases under the working directory on import, so tests run in a scratch one
+    global _original_cwd, _workdir
+    _original_cwd = os.getcwd()
+    _workdir = tempfile.mkdtemp(prefix="sisyphus-tests-")
+    os.chdir(_workdir)
+
+
+def pytest_unconfigure(config):
+    os.chdir(_original_cwd)
+    shutil.rmtree(_workdir, ignore_errors=True)
@@ -0,0 +1,120 @@
+import asyncio
+import sqlite3
+
+import pytest
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+import sisyphus
+from storage.checkpoint import SqliteCheckpointSaver
+from tools import tool_registry
+
+THREAD_ID = "checkpoint-test"
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Answers with the next message of its script; exceptions in the script are raised instead"""
+    script: list
+    position: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        reply = self.script[self.position]
+        self.position += 1
+        if isinstance(reply, Exception):
+            raise reply
+        return ChatResult(generations=[ChatGeneration(message=reply)])
+
+
+@pytest.fixture
+def echo_calls(monkeypatch):
+    calls = []
+
+    @tool
+    def echo(text: str) -> str:
+        """Repeat the text"""
+        calls.append(text)
+        return f"echo: {text}"
+
+    monkeypatch.setattr(tool_registry, "tools", [echo])
+    return calls
+
+
+def use_model(monkeypatch, *script):
+    # gen_graph imports init_chat_model when it builds the graph
+    import langchain.chat_models
+
+    model = ScriptedChatModel(script=list(script))
+    monkeypatch.setattr(langchain.chat_models, "init_chat_model", lambda *args, **kwargs: model)
+    return model
+
+
+def tool_call_reply(message_id: str, text: str) -> AIMessage:
+    return AIMessage("", id=message_id, tool_calls=[{"name": "echo", "args": {"text": text}, "id": f"call-{text}"}])
+
+
+def load_state(path):
+    """The thread's state as a fresh saver reads it back from the database"""
+    graph = sisyphus.gen_graph("scripted", checkpointer=SqliteCheckpointSaver(str(path)))
+    return asyncio.run(graph.aget_state({"configurable": {"thread_id": THREAD_ID}})).values
+
+
+def test_run_is_reloaded_by_a_fresh_saver(tmp_path, monkeypatch, echo_calls):
+    path = tmp_path / "checkpoint.db"
+    use_model(monkeypatch, tool_call_reply("ai-1", "first"), tool_call_reply("ai-2", "second"),
+              AIMessage("done", id="ai-3"))
+
+    graph = sisyphus.gen_graph("scripted", checkpointer=SqliteCheckpointSaver(str(path)))
+    asyncio.run(sisyphus.Sisyphus(max_step=10, graph=graph, thread_id=THREAD_ID).arun("echo twice"))
+    assert echo_calls == ["first", "second"]
+
+    values = load_state(path)
+    messages = values["messages"]
+    assert values["current_step"] == 2
+    assert [type(message) for message in messages] == [SystemMessage, HumanMessage, AIMessage, ToolMessage,
+                                                      AIMessage, ToolMessage, AIMessage]
+    assert messages[1].content == "echo twice"
+    assert [message.content for message in messages if isinstance(message, ToolMessage)] == \
+           ["echo: first", "echo: second"]
+    assert messages[-1].content == "done"
+
+    # Every message is stored once, checkpoints only refer to it by id
+    with sqlite3.connect(path) as conn:
+        stored = conn.execute("SELECT message_id FROM messages WHERE thread_id = ?", (THREAD_ID,)).fetchall()
+    assert sorted(message_id for message_id, in stored) == sorted(message.id for message in messages)
+
+
+def test_interrupted_run_resumes_from_its_last_checkpoint(tmp_path, monkeypatch, echo_calls):
+    path = tmp_path / "checkpoint.db"
+    use_model(monkeypatch, tool_call_reply("ai-1", "first"), ConnectionError("model went away"))
+
+    graph = sisyphus.gen_graph("scripted", checkpointer=SqliteCheckpointSaver(str(path)))
+    with pytest.raises(ConnectionError):
+        asyncio.run(sisyphus.Sisyphus(max_step=10, graph=graph, thread_id=THREAD_ID).arun("echo once"))
+    assert echo_calls == ["first"]
+
+    # A new process: fresh saver and graph, only the thread id is known
+    model = use_model(monkeypatch, AIMessage("done", id="ai-2"))
+    graph = sisyphus.gen_graph("scripted", checkpointer=SqliteCheckpointSaver(str(path)))
+    asyncio.run(sisyphus.Sisyphus(max_step=10, graph=graph, thread_id=THREAD_ID).aresume())
+
+    # The finished tool call is not replayed, the model is only asked for the step that failed
+    assert echo_calls == ["first"]
+    assert model.position == 1
+    messages = load_state(path)["messages"]
+    assert [message.content for message in messages[1:]] == ["echo once", "", "echo: first", "done"]
+
+
+def test_resume_without_checkpoint(tmp_path, monkeypatch, echo_calls):
+    use_model(monkeypatch)
+    graph = sisyphus.gen_graph("scripted", checkpointer=SqliteCheckpointSaver(str(tmp_path / "checkpoint.db")))
+    with pytest.raises(ValueError, match="No checkpoint found"):
+        asyncio.run(sisyphus.Sisyphus(max_step=10, graph=graph, thread_id=THREAD_ID).aresume())
@@ -0,0 +1,102 @@
+import random
+import sys
+
+from tools.browser.cls import DOMBaseNode, DOMElementNode, DOMTextNode
+
+INCLUDE_ATTRIBUTES = ["title", "type", "name", "role", "aria-label", "placeholder", "value", "alt"]
+
+
+def render_recursive(root: DOMElementNode, include_attributes: list[str] | None = None) -> str:
+    """clickable_elements_to_string as it was before the single traversal, kept as the reference output"""
+    formatted_text = []
+
+    def process_node(node: DOMBaseNode, depth: int) -> None:
+        if isinstance(node, DOMElementNode):
+            if node.highlight_index is not None:
+                text = node.get_all_text_till_next_clickable_element()
+
+                display_attributes = []
+                if include_attributes:
+                    for key, value in node.attributes.items():
+                        if key in include_attributes and value and value != node.tag_name:
+                            if text and value in text:
+                                continue
+                            display_attributes.append(str(value))
+                attributes_str = ';'.join(display_attributes)
+
+                line = f'[{node.highlight_index}]<{node.tag_name}'
+                for attr_name in ['id', 'href', 'name', 'value', 'type']:
+                    if attr_name in node.attributes and node.attributes[attr_name]:
+                        line += f' {attr_name}="{node.attributes[attr_name]}"'
+                if text:
+                    line += f'> {text}'
+                elif attributes_str:
+                    line += f'> {attributes_str}'
+                else:
+                    line += f'> {node.tag_name.upper()}'
+                formatted_text.append(line + ' </>')
+
+            for child in node.children:
+                process_node(child, depth + 1)
+
+        elif isinstance(node, DOMTextNode):
+            if not node.has_parent_with_highlight_index() and node.is_visible:
+                if node.text and node.text.strip():
+                    formatted_text.append(node.text)
+
+    process_node(root, 0)
+    result = '\n'.join(formatted_text)
+    return result if result.strip() else "No interactive elements found"
+
+
+def random_tree(rng: random.Random, size: int) -> DOMElementNode:
+    """Random tree with nested highlighted elements, hidden and blank text, and attributes repeating the text"""
+    root = DOMElementNode(is_visible=True, tag_name="body")
+    elements, next_index = [root], 0
+    for _ in range(size):
+        parent = rng.choice(elements)
+        if rng.random() < 0.4:
+            text = rng.choice(["", " ", "\n", "Search", "Sign in", "Search results"])
+            parent.children.append(DOMTextNode(is_visible=rng.random() < 0.8, text=text, parent=parent))
+            continue
+
+        highlight_index = None
+        if rng.random() < 0.5:
+            highlight_index, next_index = next_index, next_index + 1
+        tag_name = rng.choice(["a", "div", "button", "input", "span"])
+        attributes = rng.choice([{}, {"href": "/search"}, {"title": "Search"}, {"type": "button", "name": "q"},
+                                 {"aria-label": "Sign in", "id": "login"}, {"role": tag_name}, {"value": ""}])
+        element = DOMElementNode(is_visible=True, tag_name=tag_name, attributes=dict(attributes),
+                                 highlight_index=highlight_index, parent=parent)
+        parent.children.append(element)
+        elements.append(element)
+    return root
+
+
+def test_matches_recursive_renderer():
+    for seed in range(300):
+        root = random_tree(random.Random(seed), 80)
+        for include_attributes in (None, INCLUDE_ATTRIBUTES):
+            assert root.clickable_elements_to_string(include_attributes) == \
+                   render_recursive(root, include_attributes), f"seed {seed}"
+
+
+def test_empty_tree():
+    root = DOMElementNode(is_visible=True, tag_name="body")
+    root.children.append(DOMTextNode(is_visible=True, text="  ", parent=root))
+    assert root.clickable_elements_to_string() == "No interactive elements found"
+
+
+def test_deeper_than_recursion_limit():
+    root = current = DOMElementNode(is_visible=True, tag_name="body")
+    depth = sys.getrecursionlimit() * 2
+    for level in range(depth):
+        element = DOMElementNode(is_visible=True, tag_name="div", parent=current,
+                                 highlight_index=level if level % 100 == 0 else None)
+        element.children.append(DOMTextNode(is_visible=True, text=f"level {level}", parent=element))
+        current.children.append(element)
+        current = element
+
+    # Each element's text runs up to the next highlighted element
+    highlighted = [line for line in root.clickable_elements_to_string().splitlines() if line.startswith("[")]
+    assert highlighted == [f"[{level}]<div> level {level}" for level in range(0, depth, 100)]
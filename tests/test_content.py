@@ -0,0 +1,36 @@
+from tools.browser.content import bm25_scores, chunk_blocks, rank_chunks, tokenize
+
+
+def test_tokenize_drops_stopwords_and_single_characters():
+    assert tokenize("Find the cheapest flights to Paris, a city") == ["cheapest", "flights", "to", "paris", "city"]
+
+
+def test_chunk_blocks_groups_short_blocks():
+    blocks = ["a" * 30, "b" * 30, "c" * 30]
+    assert chunk_blocks(blocks, chunk_chars=70) == ["a" * 30 + "\n\n" + "b" * 30, "c" * 30]
+
+
+def test_chunk_blocks_splits_long_blocks():
+    chunks = chunk_blocks(["x" * 250, "short"], chunk_chars=100)
+    assert chunks == ["x" * 100, "x" * 100, "x" * 50 + "\n\nshort"]
+    assert "".join(chunks).replace("\n\n", "") == "x" * 250 + "short"
+
+
+def test_chunk_blocks_empty():
+    assert chunk_blocks([], chunk_chars=100) == []
+
+
+def test_bm25_scores():
+    documents = ["flights to paris and flights to rome", "hotels in paris", "car rental"]
+    scores = bm25_scores(documents, "flights paris")
+    assert scores[0] > scores[1] > scores[2] == 0
+    assert bm25_scores(documents, "the and") == [0.0] * 3
+
+
+def test_rank_chunks_most_relevant_first():
+    chunks = ["About us", "Opening hours", "Flight prices to Paris: 120 EUR", "Paris hotels"]
+    assert rank_chunks(chunks, "flight prices to Paris") == [2, 3, 0, 1]
+
+
+def test_rank_chunks_keeps_page_order_without_matches():
+    assert rank_chunks(["one", "two", "three"], "weather in Tokyo") == [0, 1, 2]
@@ -0,0 +1,46 @@
+import os
+import re
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold import of the entry point, in seconds; about 1s without the browser and search dependencies
+IMPORT_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "1.5"))
+
+# Dependencies only the tools using them may import
+DEFERRED_MODULES = ("playwright", "fastapi", "uvicorn", "PIL", "pytesseract", "tavily")
+
+_IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def _import_sisyphus(workdir):
+    """Import the entry point in a fresh interpreter; returns the total import time and the imported modules.
+    It runs in `workdir` since the storage module opens its databases under the working directory on import.
+    """
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, os.getenv("PYTHONPATH")]))}
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import sisyphus"],
+                            cwd=workdir, env=env, capture_output=True, text=True, check=True)
+
+    total, modules = 0, []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            modules.append(match.group(3))
+            # Only top level imports, their cumulative time already covers what they import
+            if not match.group(2):
+                total += int(match.group(1))
+    return total / 1e6, modules
+
+
+def test_deferred_modules_not_imported(tmp_path):
+    _, modules = _import_sisyphus(tmp_path)
+    imported = [name for name in DEFERRED_MODULES
+                if any(module == name or module.startswith(f"{name}.") for module in modules)]
+    assert not imported, f"importing sisyphus pulls in {', '.join(imported)}"
+
+
+def test_import_time_within_budget(tmp_path):
+    # Best of three, so a busy machine does not fail the test
+    total = min(_import_sisyphus(tmp_path)[0] for _ in range(3))
+    assert total <= IMPORT_BUDGET, f"importing sisyphus took {total:.2f}s, budget is {IMPORT_BUDGET}s"
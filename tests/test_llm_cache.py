@@ -0,0 +1,89 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.tools import tool
+
+from storage.llm_cache import LLMResponseCache
+
+
+@tool
+def search(query: str) -> str:
+    """Search the web"""
+    return query
+
+
+@tool
+def fetch(url: str) -> str:
+    """Fetch a page"""
+    return url
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(directory=str(tmp_path))
+
+
+def prompt(run: str, result: str = "3 results"):
+    """A prompt as a run would render it, ids differ between runs as they do between real ones"""
+    return [
+        SystemMessage("You are an agent", id=f"{run}-system"),
+        HumanMessage("find flights", id=f"{run}-human"),
+        AIMessage("", id=f"{run}-ai", tool_calls=[{"name": "search", "args": {"query": "flights"}, "id": f"{run}-call"}]),
+        ToolMessage(f'{result}, expand message_id "{run}-tool" for the full output', tool_call_id=f"{run}-call",
+                    id=f"{run}-tool"),
+    ]
+
+
+def tool_call_response(*call_ids):
+    return AIMessage("", id="run-original",
+                     tool_calls=[{"name": "search", "args": {"query": "flights"}, "id": call_id}
+                                 for call_id in call_ids],
+                     additional_kwargs={"tool_calls": [
+                         {"id": call_id, "type": "function",
+                          "function": {"name": "search", "arguments": '{"query": "flights"}'}}
+                         for call_id in call_ids]})
+
+
+def test_key_ignores_ids(cache):
+    scope = LLMResponseCache.scope("model", [search])
+    assert cache.key(scope, prompt("first")) == cache.key(scope, prompt("second"))
+
+
+def test_key_depends_on_content_model_and_tools(cache):
+    scope = LLMResponseCache.scope("model", [search])
+    key = cache.key(scope, prompt("first"))
+    assert cache.key(scope, prompt("first", result="no results")) != key
+    assert cache.key(LLMResponseCache.scope("other-model", [search]), prompt("first")) != key
+    assert cache.key(LLMResponseCache.scope("model", [search, fetch]), prompt("first")) != key
+
+
+def test_miss_then_hit(cache):
+    key = cache.key(LLMResponseCache.scope("model", [search]), prompt("first"))
+    assert cache.get(key) is None
+
+    cache.set(key, AIMessage("done", id="run-original"))
+    response = cache.get(key)
+    assert response.content == "done"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_hits_get_fresh_ids(cache):
+    cache.set("key", tool_call_response("call_a", "call_b"))
+    first, second = cache.get("key"), cache.get("key")
+
+    for response in (first, second):
+        assert response.id.startswith("run-") and response.id != "run-original"
+        call_ids = [tc["id"] for tc in response.tool_calls]
+        assert len(set(call_ids)) == 2 and not {"call_a", "call_b"} & set(call_ids)
+        assert all(call_id.startswith("call_") for call_id in call_ids)
+        # The provider's raw tool calls carry the same ids, in the same order
+        assert [tc["id"] for tc in response.additional_kwargs["tool_calls"]] == call_ids
+        assert [tc["args"] for tc in response.tool_calls] == [{"query": "flights"}] * 2
+
+    assert first.id != second.id
+    assert {tc["id"] for tc in first.tool_calls}.isdisjoint(tc["id"] for tc in second.tool_calls)
+
+
+def test_hit_leaves_stored_response_unchanged(cache):
+    cache.set("key", tool_call_response("call_a"))
+    cache.get("key")
+    assert cache.cache.get("key").tool_calls[0]["id"] == "call_a"
@@ -0,0 +1,54 @@
+from tools.browser.cls import DOMElementNode, DOMTextNode
+from tools.browser.serializer import estimate_tokens, serialize_elements
+
+
+def page(*elements: tuple[str, str, bool]) -> dict[int, DOMElementNode]:
+    """Selector map of links under one body, given as (text, href, in viewport) in page order"""
+    root = DOMElementNode(is_visible=True, tag_name="body")
+    selector_map = {}
+    for index, (text, href, in_viewport) in enumerate(elements):
+        link = DOMElementNode(is_visible=True, tag_name="a", attributes={"href": href}, highlight_index=index,
+                              is_in_viewport=in_viewport, parent=root)
+        link.children.append(DOMTextNode(is_visible=True, text=text, parent=link))
+        root.children.append(link)
+        selector_map[index] = link
+    return selector_map
+
+
+def listed(output: str) -> list[int]:
+    return [int(line[1:line.index("]")]) for line in output.splitlines() if line.startswith("[")]
+
+
+def test_everything_fits():
+    selector_map = page(("Home", "/", True), ("Flights", "/flights", False))
+    assert serialize_elements(selector_map, token_budget=1000) == \
+           '[0]<a href="/"> Home </>\n[1]<a href="/flights"> Flights </>'
+
+
+def test_empty():
+    assert serialize_elements({}, token_budget=1000) == "No interactive elements found"
+
+
+def test_viewport_first_then_relevance_in_page_order():
+    selector_map = page(("Careers", "/jobs", False), ("Cheap flights to Paris", "/flights", False),
+                        ("Home", "/", True), ("Hotels", "/hotels", False))
+    line_tokens = max(estimate_tokens(f'[{index}]<a href="{element.attributes["href"]}"> '
+                                      f'{element.get_all_text_till_next_clickable_element()} </>')
+                      for index, element in selector_map.items())
+
+    output = serialize_elements(selector_map, token_budget=line_tokens * 2, goal="book flights to Paris")
+    assert listed(output) == [1, 2]
+    assert output.splitlines()[-1].startswith("... 2 more elements not shown")
+
+
+def test_page_order_without_goal():
+    selector_map = page(*[(f"Item {index}", f"/item/{index}", False) for index in range(10)])
+    output = serialize_elements(selector_map, token_budget=estimate_tokens('[0]<a href="/item/0"> Item 0 </>') * 3)
+    assert listed(output) == [0, 1, 2]
+    assert "7 more elements" in output
+
+
+def test_long_text_is_cut():
+    selector_map = page(("word " * 100, "/long", True))
+    output = serialize_elements(selector_map, token_budget=1000, max_text_length=20)
+    assert output == '[0]<a href="/long"> word word word word... </>'
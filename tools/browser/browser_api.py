@@ -1,22 +1,27 @@
 import asyncio
 import base64
-import io
 import json
 import logging
 import os
 import random
+import time
 import traceback
-from dataclasses import dataclass, field
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
-from functools import cached_property
 from typing import Optional, List, Dict, Any
 
-import pytesseract
-from PIL import Image
 from fastapi import FastAPI, APIRouter, HTTPException, Body
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 from pydantic import BaseModel
 
+from tools.browser.browser_profile import BrowserProfile
+from tools.browser.cls import CoordinateSet, ViewportInfo, DOMTextNode, DOMElementNode, DOMState
+from tools.browser.content import chunk_blocks, rank_chunks
+from tools.browser.ocr import ocr_image
+from tools.browser.serializer import serialize_elements
+from tools.util import current_session
+
 
 #######################################################
 # Action model definitions
@@ -49,6 +54,10 @@ class ScrollAction(BaseModel):
     amount: Optional[int] = None
 
 
+class ListElementsAction(BaseModel):
+    page: int
+
+
 class SendKeysAction(BaseModel):
     keys: str
 
@@ -91,184 +100,6 @@ class DoneAction(BaseModel):
     text: str = ""
 
 
-#######################################################
-# DOM Structure Models
-#######################################################
-
-@dataclass
-class CoordinateSet:
-    x: int = 0
-    y: int = 0
-    width: int = 0
-    height: int = 0
-
-
-@dataclass
-class ViewportInfo:
-    width: int = 0
-    height: int = 0
-    scroll_x: int = 0
-    scroll_y: int = 0
-
-
-@dataclass
-class HashedDomElement:
-    tag_name: str
-    attributes: Dict[str, str]
-    is_visible: bool
-    page_coordinates: Optional[CoordinateSet] = None
-
-
-@dataclass
-class DOMBaseNode:
-    is_visible: bool
-    parent: Optional['DOMElementNode'] = None
-
-
-@dataclass
-class DOMTextNode(DOMBaseNode):
-    text: str = field(default="")
-    type: str = 'TEXT_NODE'
-
-    def has_parent_with_highlight_index(self) -> bool:
-        current = self.parent
-        while current is not None:
-            if current.highlight_index is not None:
-                return True
-            current = current.parent
-        return False
-
-
-@dataclass
-class DOMElementNode(DOMBaseNode):
-    tag_name: str = field(default="")
-    xpath: str = field(default="")
-    attributes: Dict[str, str] = field(default_factory=dict)
-    children: List['DOMBaseNode'] = field(default_factory=list)
-
-    is_interactive: bool = False
-    is_top_element: bool = False
-    is_in_viewport: bool = False
-    shadow_root: bool = False
-    highlight_index: Optional[int] = None
-    viewport_coordinates: Optional[CoordinateSet] = None
-    page_coordinates: Optional[CoordinateSet] = None
-    viewport_info: Optional[ViewportInfo] = None
-
-    def __repr__(self) -> str:
-        tag_str = f'<{self.tag_name}'
-        for key, value in self.attributes.items():
-            tag_str += f' {key}="{value}"'
-        tag_str += '>'
-
-        extras = []
-        if self.is_interactive:
-            extras.append('interactive')
-        if self.is_top_element:
-            extras.append('top')
-        if self.highlight_index is not None:
-            extras.append(f'highlight:{self.highlight_index}')
-
-        if extras:
-            tag_str += f' [{", ".join(extras)}]'
-
-        return tag_str
-
-    @cached_property
-    def hash(self) -> HashedDomElement:
-        return HashedDomElement(
-            tag_name=self.tag_name,
-            attributes=self.attributes,
-            is_visible=self.is_visible,
-            page_coordinates=self.page_coordinates
-        )
-
-    def get_all_text_till_next_clickable_element(self, max_depth: int = -1) -> str:
-        text_parts = []
-
-        def collect_text(node: DOMBaseNode, current_depth: int) -> None:
-            if max_depth != -1 and current_depth > max_depth:
-                return
-
-            if isinstance(node, DOMElementNode) and node != self and node.highlight_index is not None:
-                return
-
-            if isinstance(node, DOMTextNode):
-                text_parts.append(node.text)
-            elif isinstance(node, DOMElementNode):
-                for child in node.children:
-                    collect_text(child, current_depth + 1)
-
-        collect_text(self, 0)
-        return '\n'.join(text_parts).strip()
-
-    def clickable_elements_to_string(self, include_attributes: list[str] | None = None) -> str:
-        """Convert the processed DOM content to HTML."""
-        formatted_text = []
-
-        def process_node(node: DOMBaseNode, depth: int) -> None:
-            if isinstance(node, DOMElementNode):
-                # Add element with highlight_index
-                if node.highlight_index is not None:
-                    attributes_str = ''
-                    text = node.get_all_text_till_next_clickable_element()
-
-                    # Process attributes for display
-                    display_attributes = []
-                    if include_attributes:
-                        for key, value in node.attributes.items():
-                            if key in include_attributes and value and value != node.tag_name:
-                                if text and value in text:
-                                    continue  # Skip if attribute value is already in the text
-                                display_attributes.append(str(value))
-
-                    attributes_str = ';'.join(display_attributes)
-
-                    # Build the element string
-                    line = f'[{node.highlight_index}]<{node.tag_name}'
-
-                    # Add important attributes for identification
-                    for attr_name in ['id', 'href', 'name', 'value', 'type']:
-                        if attr_name in node.attributes and node.attributes[attr_name]:
-                            line += f' {attr_name}="{node.attributes[attr_name]}"'
-
-                    # Add the text content if available
-                    if text:
-                        line += f'> {text}'
-                    elif attributes_str:
-                        line += f'> {attributes_str}'
-                    else:
-                        # If no text and no attributes, use the tag name
-                        line += f'> {node.tag_name.upper()}'
-
-                    line += ' </>'
-                    formatted_text.append(line)
-
-                # Process children regardless
-                for child in node.children:
-                    process_node(child, depth + 1)
-
-            elif isinstance(node, DOMTextNode):
-                # Add text only if it doesn't have a highlighted parent
-                if not node.has_parent_with_highlight_index() and node.is_visible:
-                    if node.text and node.text.strip():
-                        formatted_text.append(node.text)
-
-        process_node(self, 0)
-        result = '\n'.join(formatted_text)
-        return result if result.strip() else "No interactive elements found"
-
-
-@dataclass
-class DOMState:
-    element_tree: DOMElementNode
-    selector_map: Dict[int, DOMElementNode]
-    url: str = ""
-    title: str = ""
-    pixels_above: int = 0
-    pixels_below: int = 0
-
-
 #######################################################
 # Browser Action Result Model
 #######################################################
@@ -302,19 +133,366 @@ class BrowserActionResult(BaseModel):
 # Browser Automation Implementation
 #######################################################
 
-_initialized = False
+# Scans the interactive elements of a page together with its title, scroll metrics and viewport.
+# Takes the fingerprint of the previous scan and only reports that nothing changed if it still matches.
+PAGE_SCAN_JS = """
+([knownFingerprint, windowViewports]) => {
+    // Count DOM mutations so a later call can tell whether this scan is still current;
+    // stamping element indices below is not a change of the page
+    if (window.__sisyphusDomVersion === undefined) {
+        window.__sisyphusDomVersion = 0;
+        window.__sisyphusNextIndex = 1;
+        new MutationObserver(records => {
+            if (records.some(record => record.attributeName !== 'data-sisyphus-idx')) {
+                window.__sisyphusDomVersion++;
+            }
+        }).observe(document, {
+            subtree: true, childList: true, attributes: true, characterData: true
+        });
+        // Typing, checking and selecting change value and checked properties, which mutations do not cover
+        for (const type of ['input', 'change']) {
+            document.addEventListener(type, () => { window.__sisyphusDomVersion++; }, true);
+        }
+    }
+
+    const body = document.body;
+    const html = document.documentElement;
+    const totalHeight = Math.max(
+        body ? body.scrollHeight : 0, body ? body.offsetHeight : 0,
+        html.clientHeight, html.scrollHeight, html.offsetHeight
+    );
+    // Elements are only fully read within windowViewports viewports of the scan window, which follows the
+    // scroll position unless list_elements moved it to another part of the page (0 reads the whole page)
+    const anchor = window.__sisyphusScanAnchor;
+    const windowTop = anchor && anchor.scrollY === window.scrollY ? anchor.top : window.scrollY;
+    const fingerprint = [window.__sisyphusDomVersion, window.scrollX, window.scrollY,
+                         window.innerWidth, window.innerHeight, totalHeight, windowTop];
+    if (knownFingerprint && fingerprint.every((value, i) => value === knownFingerprint[i])) {
+        return {unchanged: true};
+    }
+
+    // Helper function to get all attributes as an object
+    function getAttributes(el) {
+        const attributes = {};
+        for (const attr of el.attributes) {
+            if (attr.name !== 'data-sisyphus-idx') {
+                attributes[attr.name] = attr.value;
+            }
+        }
+        return attributes;
+    }
+
+    // Find all potentially interactive elements
+    const interactiveElements = Array.from(document.querySelectorAll(
+        'a, button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="radio"], [tabindex]:not([tabindex="-1"])'
+    ));
+
+    // Elements outside the window are only counted per viewport-sized page, from their bounding box alone
+    const viewportHeight = window.innerHeight || 1;
+    const windowStart = windowViewports > 0 ? windowTop - windowViewports * viewportHeight : -Infinity;
+    const windowEnd = windowViewports > 0 ? windowTop + (windowViewports + 1) * viewportHeight : Infinity;
+    const offscreenElements = {};
+    const windowElements = interactiveElements.filter(el => {
+        const rect = el.getBoundingClientRect();
+        if (rect.width <= 0 || rect.height <= 0) {
+            return false;
+        }
+        const top = rect.top + window.scrollY;
+        if (top + rect.height < windowStart || top > windowEnd) {
+            const pageNumber = Math.max(0, Math.floor(top / viewportHeight));
+            offscreenElements[pageNumber] = (offscreenElements[pageNumber] || 0) + 1;
+            return false;
+        }
+        return true;
+    });
+
+    // Filter for visible elements
+    const visibleElements = windowElements.filter(el => {
+        const style = window.getComputedStyle(el);
+        return style.display !== 'none' && 
+               style.visibility !== 'hidden' && 
+               style.opacity !== '0';
+    });
+
+    // Stamp every element with its index, so actions can locate it without scanning again.
+    // Elements keep their index across scans; cloned elements get a fresh one.
+    const stamped = new Set();
+    for (const el of visibleElements) {
+        let stamp = el.getAttribute('data-sisyphus-idx');
+        if (!stamp || stamped.has(stamp)) {
+            stamp = String(window.__sisyphusNextIndex++);
+            el.setAttribute('data-sisyphus-idx', stamp);
+        }
+        stamped.add(stamp);
+    }
+
+    // Map to our expected structure
+    const elements = visibleElements.map(el => {
+        const rect = el.getBoundingClientRect();
+        const isInViewport = rect.top >= 0 && 
+                          rect.left >= 0 && 
+                          rect.bottom <= window.innerHeight &&
+                          rect.right <= window.innerWidth;
+
+        return {
+            index: Number(el.getAttribute('data-sisyphus-idx')),
+            tagName: el.tagName.toLowerCase(),
+            text: el.innerText || el.value || '',
+            attributes: getAttributes(el),
+            isVisible: true,
+            isInteractive: true,
+            pageCoordinates: {
+                x: rect.left + window.scrollX,
+                y: rect.top + window.scrollY,
+                width: rect.width,
+                height: rect.height
+            },
+            viewportCoordinates: {
+                x: rect.left,
+                y: rect.top,
+                width: rect.width,
+                height: rect.height
+            },
+            isInViewport: isInViewport
+        };
+    });
+
+    return {
+        fingerprint: fingerprint,
+        elements: elements,
+        pageInfo: {
+            title: document.title,
+            scrollX: window.scrollX,
+            scrollY: window.scrollY,
+            pixelsAbove: window.scrollY,
+            pixelsBelow: Math.max(0, totalHeight - window.scrollY - window.innerHeight),
+            viewportWidth: window.innerWidth,
+            viewportHeight: window.innerHeight,
+            offscreenElements: offscreenElements,
+            scanWindow: windowViewports > 0 ? [windowStart, windowEnd] : null
+        }
+    };
+}
+"""
+# Resolves once the DOM has seen neither mutations nor scrolling for quietMs, or after timeoutMs
+QUIET_DOM_JS = """
+([quietMs, timeoutMs]) => new Promise(resolve => {
+    let quietTimer;
+    const finish = () => {
+        observer.disconnect();
+        window.removeEventListener('scroll', restart, true);
+        clearTimeout(quietTimer);
+        clearTimeout(limitTimer);
+        resolve();
+    };
+    const restart = () => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(finish, quietMs);
+    };
+    const observer = new MutationObserver(restart);
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    window.addEventListener('scroll', restart, {capture: true, passive: true});
+    const limitTimer = setTimeout(finish, timeoutMs);
+    restart();
+})
+"""
+
+# Text blocks of the page's main content, readability style: every text is read once, as part of its enclosing
+# block (a leaf div counts as one) or, for text sitting directly in a container, as a paragraph of its own;
+# paragraphs score their ancestors and the best scoring container, discounted by its link density, is taken as
+# the main content
+MAIN_CONTENT_JS = """
+() => {
+    const BLOCKS = 'p, h1, h2, h3, h4, h5, h6, li, pre, blockquote, td, th, dt, dd, figcaption';
+    const SKIPPED = 'script, style, noscript, template, nav, footer, aside, [hidden], [aria-hidden="true"]';
+    const POSITIVE = /article|body|content|entry|main|page|post|text|blog|story/i;
+    const NEGATIVE = /comment|footer|footnote|masthead|sidebar|sponsor|widget|share|social|nav|menu|related|promo|banner/i;
+    const clean = text => text.replace(/\\s+/g, ' ').trim();
+
+    const INLINE = new Set(['A', 'ABBR', 'B', 'BDI', 'BDO', 'BR', 'CITE', 'CODE', 'DATA', 'DFN', 'EM', 'FONT', 'I',
+                            'KBD', 'LABEL', 'MARK', 'Q', 'S', 'SAMP', 'SMALL', 'SPAN', 'STRONG', 'SUB', 'SUP', 'TIME',
+                            'U', 'VAR', 'WBR']);
+
+    // The element a text node is read with: its outermost enclosing block, a div holding no blocks, or else the
+    // nearest non-inline container, whose stray text becomes a paragraph of its own
+    function owner(node) {
+        let el = node.parentElement;
+        const block = el && el.closest(BLOCKS);
+        if (block) {
+            let outer = block;
+            while (outer.parentElement && outer.parentElement.closest(BLOCKS)) {
+                outer = outer.parentElement.closest(BLOCKS);
+            }
+            return {el: outer, stray: false};
+        }
+        while (el && INLINE.has(el.tagName) && el.parentElement) {
+            el = el.parentElement;
+        }
+        const leafDiv = el && el.tagName === 'DIV' && !el.querySelector(BLOCKS + ', div');
+        return {el, stray: !leafDiv};
+    }
+
+    // Whether only inline content separates two children of the same container
+    function inlineBetween(first, last) {
+        for (let node = first.nextSibling; node && node !== last; node = node.nextSibling) {
+            if (node.nodeType === Node.ELEMENT_NODE && !INLINE.has(node.tagName)) {
+                return false;
+            }
+        }
+        return true;
+    }
+
+    const blocks = [];
+    const readable = new Map();
+    const walker = document.createTreeWalker(document.body || document.documentElement, NodeFilter.SHOW_TEXT);
+    let run = null;
+    for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+        if (!node.nodeValue.trim()) {
+            continue;
+        }
+        const {el, stray} = owner(node);
+        if (!el) {
+            continue;
+        }
+        if (!readable.has(el)) {
+            readable.set(el, !el.closest(SKIPPED) && el.getClientRects().length > 0);
+        }
+        if (!readable.get(el)) {
+            continue;
+        }
+        // Stray text of one container is one paragraph until a non-inline element interrupts it,
+        // a block is read whole the first time
+        let child = node;
+        while (child.parentNode !== el) {
+            child = child.parentNode;
+        }
+        if (run && run.el === el && (!stray || inlineBetween(run.child, child))) {
+            if (stray) {
+                run.raw += node.nodeValue;
+                run.child = child;
+            }
+            continue;
+        }
+        run = stray ? {el, stray, child, raw: node.nodeValue} : {el, stray, child, raw: el.textContent};
+        blocks.push(run);
+    }
+    for (const block of blocks) {
+        block.text = clean(block.raw);
+    }
+
+    function initialScore(el) {
+        let score = 0;
+        switch (el.tagName) {
+            case 'ARTICLE': case 'MAIN': score += 10; break;
+            case 'DIV': score += 5; break;
+            case 'PRE': case 'TD': case 'BLOCKQUOTE': score += 3; break;
+            case 'OL': case 'UL': case 'DL': case 'DD': case 'DT': case 'LI': case 'FORM': score -= 3; break;
+        }
+        const names = (typeof el.className === 'string' ? el.className : '') + ' ' + el.id;
+        if (POSITIVE.test(names)) score += 25;
+        if (NEGATIVE.test(names)) score -= 25;
+        return score;
+    }
+
+    const scores = new Map();
+    for (const {el, stray, text} of blocks) {
+        if (text.length < 25 || /^H[1-6]$/.test(el.tagName)) {
+            continue;
+        }
+        // One point per paragraph and per comma, and up to three for its length
+        const score = text.split(',').length + Math.min(Math.floor(text.length / 100), 3);
+        // Stray text is a paragraph inside its container, so scoring starts at the container itself
+        let ancestor = stray ? el : el.parentElement;
+        for (let level = 0; ancestor && ancestor !== document.documentElement && level < 3; level++) {
+            if (!scores.has(ancestor)) {
+                scores.set(ancestor, initialScore(ancestor));
+            }
+            scores.set(ancestor, scores.get(ancestor) + score / (level === 0 ? 1 : level === 1 ? 2 : level * 3));
+            ancestor = ancestor.parentElement;
+        }
+    }
+
+    let main = null;
+    let best = 0;
+    for (const [candidate, score] of scores) {
+        const textLength = clean(candidate.textContent).length || 1;
+        const linkLength = Array.from(candidate.querySelectorAll('a'))
+            .reduce((total, link) => total + clean(link.textContent).length, 0);
+        const finalScore = score * (1 - Math.min(1, linkLength / textLength));
+        if (finalScore > best) {
+            best = finalScore;
+            main = candidate;
+        }
+    }
+
+    const format = ({el, stray, text}) => {
+        if (stray) return text;
+        if (/^H[1-6]$/.test(el.tagName)) return '#'.repeat(Number(el.tagName[1])) + ' ' + text;
+        if (el.tagName === 'LI') return '- ' + text;
+        return text;
+    };
+    const mainBlocks = main ? blocks.filter(block => main.contains(block.el)) : blocks;
+    return {
+        title: document.title,
+        mainFound: main !== null,
+        totalBlocks: blocks.length,
+        blocks: mainBlocks.map(format)
+    };
+}
+"""
+
+# Requests a page still has to finish before it counts as stable; images, media, fonts and beacons are not waited for
+TRACKED_RESOURCE_TYPES = {"document", "xhr", "fetch", "script", "stylesheet"}
+
+class BrowserSession:
+    """The isolated browser context, tabs and current tab of one agent session"""
+
+    def __init__(self, session_id: str, context: BrowserContext):
+        self.session_id = session_id
+        self.context = context
+        self.pages: List[Page] = []
+        self.current_page_index: int = 0
+        # Task of the agent driving this session, used to pick what to show when the page is too large
+        self.goal: str = ""
+        # Actions currently running in this session; busy sessions are never evicted
+        self.in_use: int = 0
+        # Set once the agent run owning the session has finished, only released sessions are evicted
+        self.released: bool = False
 
 
 class BrowserAutomation:
-    def __init__(self):
+    def __init__(self, profile: Optional[BrowserProfile] = None):
         self.router = APIRouter()
+        self.profile = profile or BrowserProfile.from_env()
         self.browser: Browser = None
-        self.browser_context: BrowserContext = None
-        self.pages: List[Page] = []
-        self.current_page_index: int = 0
+        # One browser context per agent session, least recently used first
+        self.sessions: "OrderedDict[str, BrowserSession]" = OrderedDict()
+        self.max_contexts = int(os.getenv("BROWSER_MAX_CONTEXTS", "4"))
+        self._sessions_lock = asyncio.Lock()
         self.logger = logging.getLogger("browser_automation")
         self.include_attributes = ["id", "href", "src", "alt", "aria-label", "placeholder", "name", "role", "title",
                                    "value"]
+        # Last element scan of each page with the DOM fingerprint it was taken at
+        self.dom_snapshots: Dict[Page, tuple] = {}
+        # Viewports above and below the scan window whose elements are read in full, 0 reads the whole page
+        self.scan_viewports = int(os.getenv("BROWSER_SCAN_VIEWPORTS", "2"))
+        # Size of the chunks extract_content returns, in characters
+        self.content_chunk_chars = int(os.getenv("BROWSER_CONTENT_CHUNK_CHARS", "4000"))
+        # With diff mode on, action results only list the elements changed since the page's previous state
+        self.dom_diff = os.getenv("BROWSER_DOM_DIFF", "false").lower() == "true"
+        # Token budget for the elements of a full browser state, 0 lists all of them
+        self.element_token_budget = int(os.getenv("BROWSER_ELEMENT_TOKEN_BUDGET", "3000"))
+        self.previous_dom_states: Dict[Page, DOMState] = {}
+        # Tracked requests in flight per page, and how long the DOM must be quiet for a page to count as stable
+        self.inflight_requests: Dict[Page, int] = {}
+        self.stable_quiet_ms = int(os.getenv("BROWSER_STABLE_QUIET_MS", "250"))
+        self.stable_timeout = float(os.getenv("BROWSER_STABLE_TIMEOUT", "5"))
+        # Screenshots and OCR are only produced on demand, cached per (page, navigation, DOM fingerprint)
+        self.screen_captures: "OrderedDict[tuple, dict]" = OrderedDict()
+        self.navigations: Dict[Page, int] = {}
+        self.max_screen_captures = 32
+        self.ocr_workers = int(os.getenv("BROWSER_OCR_WORKERS", "2"))
+        self._ocr_slots = asyncio.Semaphore(self.ocr_workers)
 
         # Register routes
         self.router.on_startup.append(self.startup)
@@ -345,6 +523,7 @@ class BrowserAutomation:
         self.router.post("/automation/scroll_down")(self.scroll_down)
         self.router.post("/automation/scroll_up")(self.scroll_up)
         self.router.post("/automation/scroll_to_text")(self.scroll_to_text)
+        self.router.post("/automation/list_elements")(self.list_elements)
 
         # Dropdown actions
         self.router.post("/automation/get_dropdown_options")(self.get_dropdown_options)
@@ -355,11 +534,14 @@ class BrowserAutomation:
 
         # Direct state access
         self.router.get("/automation/get_browser_state")(self.get_browser_state)
+        self.router.post("/automation/capture_screen")(self.capture_screen)
+
+        # Session lifecycle, outside /automation so releasing does not open a context
+        self.router.post("/sessions/{session_id:path}/release")(self.release_session)
 
     async def startup(self):
-        """Initialize the browser instance on startup"""
-        global _initialized
-        if _initialized:
+        """Launch the shared browser on startup; sessions get their own contexts when first used"""
+        if self.browser is not None:
             return
 
         try:
@@ -367,15 +549,14 @@ class BrowserAutomation:
             playwright = await async_playwright().start()
             print("Playwright started, launching browser...")
 
-            # Use non-headless mode for testing with slower timeouts
+            # Headless mode comes from the browser profile
             launch_options = {
-                "headless": False,
+                **self.profile.launch_options(),
                 "timeout": 60000
             }
 
             try:
                 self.browser = await playwright.chromium.launch(**launch_options)
-                self.browser_context = await self.browser.new_context(viewport={'width': 1024, 'height': 768})
                 print("Browser launched successfully")
             except Exception as browser_error:
                 print(f"Failed to launch browser: {browser_error}")
@@ -383,35 +564,9 @@ class BrowserAutomation:
                 print("Retrying with minimal options...")
                 launch_options = {"timeout": 90000}
                 self.browser = await playwright.chromium.launch(**launch_options)
-                self.browser_context = await self.browser.new_context(viewport={'width': 1024, 'height': 768})
                 print("Browser launched with minimal options")
 
-            # Get existing pages from the browser context first
-            existing_pages = self.browser_context.pages
-            if existing_pages:
-                print(f"Found {len(existing_pages)} existing pages")
-                self.pages = existing_pages
-                self.current_page_index = 0
-            else:
-                print("No existing pages, creating initial page")
-                # Create initial page BEFORE setting up event handler
-                page = await self.browser_context.new_page()
-                self.pages = [page]
-                self.current_page_index = 0
-                # Navigate to google.com
-                await page.goto("https://www.google.com", wait_until="domcontentloaded", timeout=30000)
-                print("Created initial page and navigated to google.com")
-
-            # Set up page event handler AFTER initial setup
-            try:
-                self.browser_context.on("page", self.handle_page_created)
-                print("Page event handler set up")
-            except Exception as e:
-                print(f"Error setting up page event handler: {e}")
-                traceback.print_exc()
-
             print("Browser initialization completed successfully")
-            _initialized = True
         except Exception as e:
             print(f"Browser startup error: {str(e)}")
             traceback.print_exc()
@@ -419,17 +574,195 @@ class BrowserAutomation:
 
     async def shutdown(self):
         """Clean up browser instance on shutdown"""
-        if self.browser_context:
-            await self.browser_context.close()
+        for session in list(self.sessions.values()):
+            await session.context.close()
+        self.sessions.clear()
         if self.browser:
             await self.browser.close()
 
-    async def handle_page_created(self, page: Page):
+    async def create_session(self, session_id: str) -> BrowserSession:
+        """Open a new browser context for a session, with an initial tab on google.com"""
+        context = await self.browser.new_context(**self.profile.context_options())
+        await self.profile.apply(context)
+        session = BrowserSession(session_id, context)
+
+        # Create initial page BEFORE setting up event handler
+        page = await context.new_page()
+        self.watch_page(page)
+        session.pages = [page]
+        await page.goto("https://www.google.com", wait_until="domcontentloaded", timeout=30000)
+        print(f"Opened browser context for session {session_id}")
+
+        # Set up page event handler AFTER initial setup
+        context.on("page", lambda new_page: self.handle_page_created(new_page, session))
+        return session
+
+    async def open_session(self, session_id: str) -> BrowserSession:
+        """Get the session's browser context, creating it and evicting released least recently used ones as needed.
+
+        Sessions of runs still in progress are kept even while idle, an agent waiting on its LLM call would lose its
+        tabs otherwise; with no released session left the limit is exceeded instead.
+        """
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self.sessions.move_to_end(session_id)
+            return session
+
+        async with self._sessions_lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                while len(self.sessions) >= self.max_contexts:
+                    # Looked up again after every close, since other actions may have picked up a session meanwhile
+                    idle_id = next((sid for sid, idle in self.sessions.items()
+                                    if idle.released and idle.in_use == 0), None)
+                    if idle_id is None:
+                        print(f"All {len(self.sessions)} browser contexts belong to running sessions, "
+                              f"opening one beyond BROWSER_MAX_CONTEXTS={self.max_contexts}")
+                        break
+                    idle_session = self.sessions.pop(idle_id)
+                    print(f"Evicting browser context of session {idle_id}")
+                    await idle_session.context.close()
+
+                session = await self.create_session(session_id)
+                self.sessions[session_id] = session
+
+            self.sessions.move_to_end(session_id)
+            return session
+
+    @asynccontextmanager
+    async def session_scope(self, session_id: str, goal: Optional[str] = None):
+        """Run the enclosed actions in the session's own browser context"""
+        session = await self.open_session(session_id)
+        if goal:
+            session.goal = goal
+        token = current_session.set(session_id)
+        session.released = False
+        session.in_use += 1
+        try:
+            yield session
+        finally:
+            session.in_use -= 1
+            current_session.reset(token)
+
+    async def release_session(self, session_id: str):
+        """Mark the session's run as finished; its context stays open until another session needs the room"""
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.released = True
+        return {"released": session is not None}
+
+    @property
+    def session(self) -> BrowserSession:
+        session = self.sessions.get(current_session.get())
+        if session is None:
+            raise HTTPException(status_code=500, detail=f"No browser session open for {current_session.get()}")
+        return session
+
+    @property
+    def browser_context(self) -> BrowserContext:
+        return self.session.context
+
+    @property
+    def pages(self) -> List[Page]:
+        return self.session.pages
+
+    @pages.setter
+    def pages(self, pages: List[Page]):
+        self.session.pages = pages
+
+    @property
+    def current_page_index(self) -> int:
+        return self.session.current_page_index
+
+    @current_page_index.setter
+    def current_page_index(self, index: int):
+        self.session.current_page_index = index
+
+    def watch_page(self, page: Page):
+        """Count the page's requests in flight, and drop its DOM snapshot and screen captures when it navigates
+        or closes"""
+        if page in self.inflight_requests:
+            return
+        self.inflight_requests[page] = 0
+
+        def on_request(request):
+            if request.resource_type in TRACKED_RESOURCE_TYPES:
+                self.inflight_requests[page] += 1
+
+        def on_request_done(request):
+            if request.resource_type in TRACKED_RESOURCE_TYPES:
+                self.inflight_requests[page] = max(0, self.inflight_requests[page] - 1)
+
+        def on_frame_navigated(frame):
+            if frame == page.main_frame:
+                self.dom_snapshots.pop(page, None)
+                self.navigations[page] = self.navigations.get(page, 0) + 1
+                self.drop_screen_captures(page)
+
+        def on_close(_):
+            self.dom_snapshots.pop(page, None)
+            self.previous_dom_states.pop(page, None)
+            self.inflight_requests.pop(page, None)
+            self.navigations.pop(page, None)
+            self.drop_screen_captures(page)
+
+        page.on("request", on_request)
+        page.on("requestfinished", on_request_done)
+        page.on("requestfailed", on_request_done)
+        page.on("framenavigated", on_frame_navigated)
+        page.on("close", on_close)
+
+    def drop_screen_captures(self, page: Page):
+        for key in [key for key in self.screen_captures if key[0] is page]:
+            del self.screen_captures[key]
+
+    async def wait_for_stable(self, page: Page, timeout: Optional[float] = None) -> float:
+        """Wait until the DOM is quiet and no tracked requests are in flight, for at most `timeout` seconds
+        Returns the time waited
+        """
+        timeout = self.stable_timeout if timeout is None else timeout
+        started = time.perf_counter()
+        deadline = started + timeout
+
+        backoff = 0.05
+        while not page.is_closed():
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                print(f"Page did not settle within {timeout}s, proceeding anyway")
+                break
+
+            try:
+                # The script bounds itself, but a page whose main thread is blocked or whose timers do not run
+                # never resolves it, so the bound is enforced here as well
+                await asyncio.wait_for(page.evaluate(QUIET_DOM_JS, [self.stable_quiet_ms, int(remaining * 1000)]),
+                                       remaining)
+            except asyncio.TimeoutError:
+                print(f"Page did not settle within {timeout}s, proceeding anyway")
+                break
+            except Exception:
+                # The page navigated while waiting, give the new document a chance to load; back off in case
+                # evaluate keeps failing for another reason
+                try:
+                    await page.wait_for_load_state("domcontentloaded", timeout=remaining * 1000)
+                except Exception:
+                    pass
+                await asyncio.sleep(min(backoff, max(0.0, deadline - time.perf_counter())))
+                backoff = min(backoff * 2, 1.0)
+                continue
+
+            if not self.inflight_requests.get(page):
+                break
+            await asyncio.sleep(0.05)
+
+        return time.perf_counter() - started
+
+    async def handle_page_created(self, page: Page, session: BrowserSession):
         """Handle new page creation"""
-        await asyncio.sleep(0.5)
-        self.pages.append(page)
-        self.current_page_index = len(self.pages) - 1
-        print(f"Page created: {page.url}; current page index: {self.current_page_index}")
+        self.watch_page(page)
+        if page not in session.pages:
+            session.pages.append(page)
+        session.current_page_index = session.pages.index(page)
+        print(f"Page created: {page.url}; current page index: {session.current_page_index}")
 
     async def get_current_page(self) -> Page:
         """Get the current active page"""
@@ -437,76 +770,32 @@ class BrowserAutomation:
             raise HTTPException(status_code=500, detail="No browser pages available")
         return self.pages[self.current_page_index]
 
-    async def get_selector_map(self) -> Dict[int, DOMElementNode]:
-        """Get a map of selectable elements on the page"""
+    async def scan_page(self, timings: Optional[dict] = None) -> tuple:
+        """Scan the current page in a single evaluate
+        Returns a tuple of (selector_map, page_info) with title, scroll metrics and viewport in page_info
+
+        The last scan of each page is reused while its DOM, scroll position and layout are unchanged.
+        """
         page = await self.get_current_page()
+        snapshot = self.dom_snapshots.get(page)
 
         # Create a selector map for interactive elements
         selector_map = {}
+        page_info = {}
 
         try:
-            # More comprehensive JavaScript to find interactive elements
-            elements_js = """
-            (() => {
-                // Helper function to get all attributes as an object
-                function getAttributes(el) {
-                    const attributes = {};
-                    for (const attr of el.attributes) {
-                        attributes[attr.name] = attr.value;
-                    }
-                    return attributes;
-                }
-
-                // Find all potentially interactive elements
-                const interactiveElements = Array.from(document.querySelectorAll(
-                    'a, button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="radio"], [tabindex]:not([tabindex="-1"])'
-                ));
-
-                // Filter for visible elements
-                const visibleElements = interactiveElements.filter(el => {
-                    const style = window.getComputedStyle(el);
-                    const rect = el.getBoundingClientRect();
-                    return style.display !== 'none' && 
-                           style.visibility !== 'hidden' && 
-                           style.opacity !== '0' &&
-                           rect.width > 0 && 
-                           rect.height > 0;
-                });
-
-                // Map to our expected structure
-                return visibleElements.map((el, index) => {
-                    const rect = el.getBoundingClientRect();
-                    const isInViewport = rect.top >= 0 && 
-                                      rect.left >= 0 && 
-                                      rect.bottom <= window.innerHeight &&
-                                      rect.right <= window.innerWidth;
-
-                    return {
-                        index: index + 1,
-                        tagName: el.tagName.toLowerCase(),
-                        text: el.innerText || el.value || '',
-                        attributes: getAttributes(el),
-                        isVisible: true,
-                        isInteractive: true,
-                        pageCoordinates: {
-                            x: rect.left + window.scrollX,
-                            y: rect.top + window.scrollY,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        viewportCoordinates: {
-                            x: rect.left,
-                            y: rect.top,
-                            width: rect.width,
-                            height: rect.height
-                        },
-                        isInViewport: isInViewport
-                    };
-                });
-            })();
-            """
-
-            elements = await page.evaluate(elements_js)
+            started = time.perf_counter()
+            scan = await page.evaluate(PAGE_SCAN_JS, [snapshot[0] if snapshot is not None else None,
+                                                      self.scan_viewports])
+            if timings is not None:
+                timings['evaluate'] = time.perf_counter() - started
+
+            if scan.get('unchanged'):
+                return snapshot[1], snapshot[2]
+
+            started = time.perf_counter()
+            elements = scan['elements']
+            page_info = scan['pageInfo']
             print(f"Found {len(elements)} interactive elements in selector map")
 
             # Create a root element for the tree
@@ -563,6 +852,10 @@ class BrowserAutomation:
                 root.children.append(element_node)
                 element_node.parent = root
 
+            self.dom_snapshots[page] = (scan['fingerprint'], selector_map, page_info)
+            if timings is not None:
+                timings['build'] = time.perf_counter() - started
+
         except Exception as e:
             print(f"Error getting selector map: {e}")
             traceback.print_exc()
@@ -579,13 +872,23 @@ class BrowserAutomation:
             dummy.children.append(dummy_text)
             selector_map[1] = dummy
 
+        return selector_map, page_info
+
+    async def get_selector_map(self) -> Dict[int, DOMElementNode]:
+        """Get a map of selectable elements on the page"""
+        selector_map, _ = await self.scan_page()
         return selector_map
 
-    async def get_current_dom_state(self) -> DOMState:
+    @staticmethod
+    def element_locator(page: Page, index: int):
+        """Locate an element by the index stamped on it by get_selector_map"""
+        return page.locator(f'[data-sisyphus-idx="{index}"]')
+
+    async def get_current_dom_state(self, timings: Optional[dict] = None) -> DOMState:
         """Get the current DOM state including element tree and selector map"""
         try:
             page = await self.get_current_page()
-            selector_map = await self.get_selector_map()
+            selector_map, page_info = await self.scan_page(timings)
 
             # Create a root element
             root = DOMElementNode(
@@ -595,54 +898,29 @@ class BrowserAutomation:
                 is_top_element=True
             )
 
-            # Add all elements from selector map as children of root
+            # Add all elements from selector map as children of root. Elements of a scan are already
+            # parented to that scan's root, which must not keep them out of this tree.
             for element in selector_map.values():
                 if element.parent is None:
                     element.parent = root
-                    root.children.append(element)
-
-            # Get basic page info
-            url = page.url
-            try:
-                title = await page.title()
-            except:
-                title = "Unknown Title"
-
-            # Get more accurate scroll information - fix JavaScript syntax
-            try:
-                scroll_info = await page.evaluate("""
-                () => {
-                    const body = document.body;
-                    const html = document.documentElement;
-                    const totalHeight = Math.max(
-                        body.scrollHeight, body.offsetHeight,
-                        html.clientHeight, html.scrollHeight, html.offsetHeight
-                    );
-                    const scrollY = window.scrollY || window.pageYOffset;
-                    const windowHeight = window.innerHeight;
-
-                    return {
-                        pixelsAbove: scrollY,
-                        pixelsBelow: Math.max(0, totalHeight - scrollY - windowHeight),
-                        totalHeight: totalHeight,
-                        viewportHeight: windowHeight
-                    };
-                }
-                """)
-                pixels_above = scroll_info.get('pixelsAbove', 0)
-                pixels_below = scroll_info.get('pixelsBelow', 0)
-            except Exception as e:
-                print(f"Error getting scroll info: {e}")
-                pixels_above = 0
-                pixels_below = 0
+                root.children.append(element)
 
             return DOMState(
                 element_tree=root,
                 selector_map=selector_map,
-                url=url,
-                title=title,
-                pixels_above=pixels_above,
-                pixels_below=pixels_below
+                url=page.url,
+                title=page_info.get('title', "Unknown Title"),
+                pixels_above=page_info.get('pixelsAbove', 0),
+                pixels_below=page_info.get('pixelsBelow', 0),
+                viewport_info=ViewportInfo(
+                    width=page_info.get('viewportWidth', 0),
+                    height=page_info.get('viewportHeight', 0),
+                    scroll_x=page_info.get('scrollX', 0),
+                    scroll_y=page_info.get('scrollY', 0)
+                ),
+                offscreen_elements={int(number): count
+                                    for number, count in page_info.get('offscreenElements', {}).items()},
+                scan_window=tuple(page_info['scanWindow']) if page_info.get('scanWindow') else None
             )
         except Exception as e:
             print(f"Error getting DOM state: {e}")
@@ -675,11 +953,8 @@ class BrowserAutomation:
         try:
             page = await self.get_current_page()
 
-            # Wait for network to be idle and DOM to be stable
-            try:
-                await page.wait_for_load_state("networkidle", timeout=60000)  # Increased timeout to 60s
-            except Exception as e:
-                print(f"Warning: Network idle timeout, proceeding anyway: {e}")
+            # Wait for the DOM to be quiet and requests to finish, bounded by the stability timeout
+            await self.wait_for_stable(page)
 
             # Wait for any animations to complete
             # await page.wait_for_timeout(1000)  # Wait 1 second for animations
@@ -715,88 +990,157 @@ class BrowserAutomation:
             print(f"Error saving screenshot: {e}")
             return ""
 
-    async def extract_ocr_text_from_screenshot(self, screenshot_base64: str) -> str:
-        """Extract text from screenshot using OCR"""
+    async def extract_ocr_text_from_screenshot(self, screenshot_base64: str) -> Optional[str]:
+        """Extract text from screenshot using OCR
+        Returns None when OCR failed, so it can be retried
+        """
         if not screenshot_base64:
-            return ""
+            return None
 
         try:
-            # Decode base64 to image
+            # OCR is CPU bound, so it runs in tesseract processes instead of blocking the event loop
             image_bytes = base64.b64decode(screenshot_base64)
-            image = Image.open(io.BytesIO(image_bytes))
-
-            # Extract text using pytesseract
-            ocr_text = pytesseract.image_to_string(image)
-
-            # Clean up the text
-            ocr_text = ocr_text.strip()
-
-            return ocr_text
+            async with self._ocr_slots:
+                return await ocr_image(image_bytes)
         except Exception as e:
             print(f"Error performing OCR: {e}")
             traceback.print_exc()
-            return ""
+            return None
 
-    async def get_updated_browser_state(self, action_name: str) -> tuple:
+    @staticmethod
+    def diff_dom_states(previous: DOMState, current: DOMState) -> tuple:
+        """Indices of the elements added, removed and changed between two states of a page
+        Elements that only left the scan window of a windowed scan are not counted as removed.
+        """
+        if previous.selector_map is current.selector_map:
+            return [], [], []
+
+        added, changed = [], []
+        for index, element in current.selector_map.items():
+            previous_element = previous.selector_map.get(index)
+            if previous_element is None:
+                added.append(index)
+            elif previous_element.hash != element.hash or \
+                    previous_element.get_all_text_till_next_clickable_element() != \
+                    element.get_all_text_till_next_clickable_element():
+                changed.append(index)
+
+        def in_scan_window(element: DOMElementNode) -> bool:
+            if current.scan_window is None or element.page_coordinates is None:
+                return True
+            top = element.page_coordinates.y
+            return current.scan_window[0] <= top + element.page_coordinates.height and top <= current.scan_window[1]
+
+        removed = [index for index, element in previous.selector_map.items()
+                   if index not in current.selector_map and in_scan_window(element)]
+        return added, removed, changed
+
+    def format_dom_diff(self, dom_state: DOMState, added: list, removed: list, changed: list) -> str:
+        """Render only the elements added, removed and changed since the previous state"""
+        unchanged = len(dom_state.selector_map) - len(added) - len(changed)
+        lines = [f"Changes since the previous state of this page ({unchanged} elements unchanged, "
+                 f"use get_browser_state for the full list):"]
+
+        for prefix, indices in (("+", added), ("~", changed)):
+            for index in indices:
+                element = dom_state.selector_map[index]
+                lines.append(f"{prefix} {element.clickable_elements_to_string(include_attributes=self.include_attributes)}")
+
+        if removed:
+            lines.append(f"- removed: {', '.join(f'[{index}]' for index in removed)}")
+
+        if not (added or removed or changed):
+            lines.append("No interactive elements changed")
+
+        return '\n'.join(lines)
+
+    @staticmethod
+    def format_offscreen_elements(dom_state: DOMState) -> str:
+        """Summarize the elements a windowed scan left out, by page of the document"""
+        viewport_info = dom_state.viewport_info or ViewportInfo()
+        current_page = int(viewport_info.scroll_y // viewport_info.height) if viewport_info.height else 0
+        regions = ", ".join(f"page {number}: {count}" for number, count in sorted(dom_state.offscreen_elements.items()))
+        return (f"Elements outside the listed area by page (the viewport is on page {current_page}): {regions}. "
+                f"Use browser_list_elements with a page number to list them")
+
+    async def get_updated_browser_state(self, action_name: str, diff: bool = True) -> tuple:
         """Helper method to get updated browser state after any action
         Returns a tuple of (dom_state, screenshot, elements, metadata)
+
+        In diff mode, elements and interactive_elements only cover what changed since the page's previous
+        state, unless `diff` is False or the page moved to another url.
         """
         try:
-            # Wait a moment for any potential async processes to settle
-            await asyncio.sleep(0.5)
+            timings = {}
+            started = time.perf_counter()
+
+            # Wait for the page to settle after the action
+            await self.wait_for_stable(await self.get_current_page())
+            timings['settle'] = time.perf_counter() - started
 
             # Get updated state
-            dom_state = await self.get_current_dom_state()
+            dom_state = await self.get_current_dom_state(timings)
 
-            # Format elements for output
-            elements = dom_state.element_tree.clickable_elements_to_string(
-                include_attributes=self.include_attributes
-            )
+            started = time.perf_counter()
 
             # Collect additional metadata
             page = await self.get_current_page()
             metadata = {}
 
+            previous_dom_state = self.previous_dom_states.get(page)
+            self.previous_dom_states[page] = dom_state
+
+            listed_indices = list(dom_state.selector_map)
+            if self.dom_diff and diff and previous_dom_state is not None and previous_dom_state.url == dom_state.url:
+                added, removed, changed = self.diff_dom_states(previous_dom_state, dom_state)
+                elements = self.format_dom_diff(dom_state, added, removed, changed)
+                listed_indices = added + changed
+            elif self.element_token_budget:
+                elements = serialize_elements(dom_state.selector_map, self.element_token_budget,
+                                              goal=self.session.goal, include_attributes=self.include_attributes)
+                listed_indices = None
+            else:
+                # Format elements for output
+                elements = dom_state.element_tree.clickable_elements_to_string(
+                    include_attributes=self.include_attributes
+                )
+
+            if dom_state.offscreen_elements:
+                elements = f"{elements}\n{self.format_offscreen_elements(dom_state)}"
+
             # Get element count
             metadata['element_count'] = len(dom_state.selector_map)
 
-            # Create simplified interactive elements list
-            interactive_elements = []
-            for idx, element in dom_state.selector_map.items():
-                element_info = {
-                    'index': idx,
-                    'tag_name': element.tag_name,
-                    'text': element.get_all_text_till_next_clickable_element(),
-                    'is_in_viewport': element.is_in_viewport
-                }
+            # Create simplified interactive elements list; a budgeted state leaves it out, elements already has it all
+            interactive_elements = None
+            if listed_indices is not None:
+                interactive_elements = []
+                for idx in listed_indices:
+                    element = dom_state.selector_map[idx]
+                    element_info = {
+                        'index': idx,
+                        'tag_name': element.tag_name,
+                        'text': element.get_all_text_till_next_clickable_element(),
+                        'is_in_viewport': element.is_in_viewport
+                    }
 
-                # Add key attributes
-                for attr_name in ['id', 'href', 'src', 'alt', 'placeholder', 'name', 'role', 'title', 'type']:
-                    if attr_name in element.attributes:
-                        element_info[attr_name] = element.attributes[attr_name]
+                    # Add key attributes
+                    for attr_name in ['id', 'href', 'src', 'alt', 'placeholder', 'name', 'role', 'title', 'type']:
+                        if attr_name in element.attributes:
+                            element_info[attr_name] = element.attributes[attr_name]
 
-                interactive_elements.append(element_info)
+                    interactive_elements.append(element_info)
 
             metadata['interactive_elements'] = interactive_elements
 
-            # Get viewport dimensions - Fix syntax error in JavaScript
-            try:
-                viewport = await page.evaluate("""
-                () => {
-                    return {
-                        width: window.innerWidth,
-                        height: window.innerHeight
-                    };
-                }
-                """)
-                metadata['viewport_width'] = viewport.get('width', 0)
-                metadata['viewport_height'] = viewport.get('height', 0)
-            except Exception as e:
-                print(f"Error getting viewport dimensions: {e}")
-                metadata['viewport_width'] = 0
-                metadata['viewport_height'] = 0
+            # Viewport dimensions come with the page scan
+            viewport_info = dom_state.viewport_info or ViewportInfo()
+            metadata['viewport_width'] = viewport_info.width
+            metadata['viewport_height'] = viewport_info.height
+            timings['serialize'] = time.perf_counter() - started
 
-            print(f"Got updated state after {action_name}: {len(dom_state.selector_map)} elements")
+            timing_breakdown = ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in timings.items())
+            print(f"Got updated state after {action_name}: {len(dom_state.selector_map)} elements ({timing_breakdown})")
             return dom_state, "", elements, metadata
         except Exception as e:
             print(f"Error getting updated state after {action_name}: {e}")
@@ -1008,11 +1352,7 @@ class BrowserAutomation:
             # Perform the click at the specified coordinates
             await page.mouse.click(action.x, action.y)
 
-            # Give time for any navigation or DOM updates to occur
-            await page.wait_for_load_state("networkidle", timeout=5000)
-
-            await asyncio.sleep(1)
-            # Get updated state after action
+            # Get updated state after action, once navigation or DOM updates have settled
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
                 f"click_coordinates({action.x}, {action.y})")
 
@@ -1032,7 +1372,6 @@ class BrowserAutomation:
 
             # Try to get state even after error
             try:
-                await asyncio.sleep(1)
                 dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
                     "click_coordinates_error_recovery")
                 return self.build_action_result(
@@ -1062,9 +1401,8 @@ class BrowserAutomation:
         try:
             page = await self.get_current_page()
 
-            # Get the current state and selector map *before* the click
-            initial_dom_state = await self.get_current_dom_state()
-            selector_map = initial_dom_state.selector_map
+            # Get the selector map *before* the click, reusing the last scan if the page is unchanged
+            selector_map = await self.get_selector_map()
 
             if action.index not in selector_map:
                 # Get updated state even if element not found initially
@@ -1083,59 +1421,26 @@ class BrowserAutomation:
             element_to_click = selector_map[action.index]
             print(f"Attempting to click element: {element_to_click}")
 
-            # Construct a more reliable selector using JavaScript evaluation
-            # Find the element based on its properties captured in selector_map
-            js_selector_script = """
-            (targetElementInfo) => {
-                const interactiveElements = Array.from(document.querySelectorAll(
-                    'a, button, input, select, textarea, [role="button"], [role="link"], [role="checkbox"], [role="radio"], [tabindex]:not([tabindex="-1"])'
-                ));
-
-                const visibleElements = interactiveElements.filter(el => {
-                    const style = window.getComputedStyle(el);
-                    const rect = el.getBoundingClientRect();
-                    return style.display !== 'none' && style.visibility !== 'hidden' && style.opacity !== '0' && rect.width > 0 && rect.height > 0;
-                });
-
-                if (targetElementInfo.index > 0 && targetElementInfo.index <= visibleElements.length) {
-                    // Return the element at the specified index (1-based)
-                    return visibleElements[targetElementInfo.index - 1];
-                }
-                return null; // Element not found at the expected index
-            }
-            """
-
-            element_info = {'index': action.index}  # Pass the target index to the script
-
-            target_element_handle = await page.evaluate_handle(js_selector_script, element_info)
+            # Locate the element by the index stamped on it during the scan
+            target_element = self.element_locator(page, action.index)
 
             click_success = False
             error_message = ""
 
-            if await target_element_handle.evaluate("node => node !== null"):
+            if await target_element.count():
                 try:
-                    # Use Playwright's recommended way: click the handle
                     # Add timeout and wait for element to be stable
-                    await target_element_handle.click(timeout=5000)
+                    await target_element.first.click(timeout=5000)
                     click_success = True
-                    print(f"Successfully clicked element handle for index {action.index}")
+                    print(f"Successfully clicked element for index {action.index}")
                 except Exception as click_error:
-                    error_message = f"Error clicking element handle: {click_error}"
+                    error_message = f"Error clicking element: {click_error}"
                     print(error_message)
-                    # Optional: Add fallback methods here if needed
-                    # e.g., target_element_handle.dispatch_event('click')
             else:
-                error_message = f"Could not locate the target element handle for index {action.index} using JS script."
+                error_message = f"Could not locate the target element for index {action.index}, the page may have changed."
                 print(error_message)
 
-            # Wait for potential page changes/network activity
-            try:
-                await page.wait_for_load_state("networkidle", timeout=5000)
-            except Exception as wait_error:
-                print(f"Timeout or error waiting for network idle after click: {wait_error}")
-            await asyncio.sleep(1)
-
-            # Get updated state after action
+            # Get updated state after action, once page changes/network activity have settled
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
                 f"click_element({action.index})")
 
@@ -1203,24 +1508,10 @@ class BrowserAutomation:
                     error=f"Element with index {action.index} not found"
                 )
 
-            # In a real implementation, we would use the selector map to get the element's
-            # properties and use them to find and type into the element
-            element = selector_map[action.index]
-
-            # Use CSS selector or XPath to locate and type into the element
-            await page.wait_for_timeout(500)  # Small delay before typing
+            await self.element_locator(page, action.index).first.fill(action.text)
+            # Values are properties, not DOM mutations, so the last scan must not be reused
+            self.dom_snapshots.pop(page, None)
 
-            # Demo implementation - would use proper selectors in production
-            if element.attributes.get("id"):
-                await page.fill(f"#{element.attributes['id']}", action.text)
-            elif element.attributes.get("class"):
-                class_selector = f".{element.attributes['class'].replace(' ', '.')}"
-                await page.fill(class_selector, action.text)
-            else:
-                # Fallback to xpath
-                await page.fill(f"//{element.tag_name}[{action.index}]", action.text)
-
-            await asyncio.sleep(1)
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
                 f"input_text({action.index}, '{action.text}')")
@@ -1252,8 +1543,8 @@ class BrowserAutomation:
         try:
             page = await self.get_current_page()
             await page.keyboard.press(action.keys)
+            self.dom_snapshots.pop(page, None)
 
-            await asyncio.sleep(1)
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
                 f"send_keys({action.keys})")
@@ -1335,13 +1626,14 @@ class BrowserAutomation:
             print(f"New page created successfully")
 
             # Navigate to the URL
+            self.watch_page(new_page)
             await new_page.goto(action.url, wait_until="domcontentloaded")
-            await new_page.wait_for_load_state("networkidle", timeout=10000)
             print(f"Navigated to URL in new tab: {action.url}")
 
             # Add to page list and make it current
-            self.pages.append(new_page)
-            self.current_page_index = len(self.pages) - 1
+            if new_page not in self.pages:
+                self.pages.append(new_page)
+            self.current_page_index = self.pages.index(new_page)
             print(f"New tab added as index {self.current_page_index}")
 
             # Get updated state after action
@@ -1427,27 +1719,28 @@ class BrowserAutomation:
 
     # Content Actions
 
-    async def extract_content(self, goal: str = Body(...)):
-        """Extract content from the current page based on the provided goal"""
+    async def extract_content(self, goal: str = Body(...), chunk: int = Body(0)):
+        """Extract the main content of the current page, in chunks ranked by relevance to the goal
+        `chunk` selects which of the ranked chunks to return, the first one being the most relevant.
+        """
         try:
             page = await self.get_current_page()
-            content = await page.content()
-
-            # In a full implementation, we would use an LLM to extract specific content
-            # based on the goal. For this example, we'll extract visible text.
-            extracted_text = await page.evaluate("""
-            Array.from(document.querySelectorAll('p, h1, h2, h3, h4, h5, h6, li, span, div'))
-                .filter(el => {
-                    const style = window.getComputedStyle(el);
-                    return style.display !== 'none' && 
-                           style.visibility !== 'hidden' && 
-                           style.opacity !== '0' &&
-                           el.innerText && 
-                           el.innerText.trim().length > 0;
-                })
-                .map(el => el.innerText.trim())
-                .join('\\n\\n');
-            """)
+            extracted = await page.evaluate(MAIN_CONTENT_JS)
+
+            chunks = chunk_blocks(extracted['blocks'], self.content_chunk_chars)
+            ranking = rank_chunks(chunks, goal)
+            if not chunks:
+                extracted_text = "No text content found on the page"
+            elif not 0 <= chunk < len(chunks):
+                extracted_text = f"There is no chunk {chunk}, the content has {len(chunks)} chunks (0 to {len(chunks) - 1})"
+            else:
+                source = "main content" if extracted['mainFound'] else "page text"
+                extracted_text = f"[Chunk {chunk} of {len(chunks)} of the {source}"
+                if len(chunks) > 1:
+                    extracted_text += ", ranked by relevance to the goal"
+                if chunk + 1 < len(chunks):
+                    extracted_text += f"; request chunk {chunk + 1} for more"
+                extracted_text += f"]\n{chunks[ranking[chunk]]}"
 
             # Get updated state
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"extract_content({goal})")
@@ -1523,8 +1816,6 @@ class BrowserAutomation:
                 await page.evaluate("window.scrollBy(0, window.innerHeight);")
                 amount_str = "one page"
 
-            await page.wait_for_timeout(500)  # Wait for scroll to complete
-
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
                 f"scroll_down({amount_str})")
@@ -1562,8 +1853,6 @@ class BrowserAutomation:
                 await page.evaluate("window.scrollBy(0, -window.innerHeight);")
                 amount_str = "one page"
 
-            await page.wait_for_timeout(500)  # Wait for scroll to complete
-
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(f"scroll_up({amount_str})")
 
@@ -1604,7 +1893,6 @@ class BrowserAutomation:
                 try:
                     if await locator.count() > 0 and await locator.first.is_visible():
                         await locator.first.scroll_into_view_if_needed()
-                        await asyncio.sleep(0.5)  # Wait for scroll to complete
                         found = True
                         break
                 except Exception:
@@ -1637,6 +1925,42 @@ class BrowserAutomation:
                 content=None
             )
 
+    async def list_elements(self, action: ListElementsAction = Body(...)):
+        """List the elements around a viewport-sized page of the document without scrolling to it"""
+        try:
+            page = await self.get_current_page()
+            # The scan window stays on that page until the page scrolls or navigates
+            await page.evaluate(
+                "(pageNumber) => { window.__sisyphusScanAnchor = "
+                "{scrollY: window.scrollY, top: pageNumber * window.innerHeight}; }",
+                max(0, action.page))
+
+            # Get updated state after action
+            dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
+                f"list_elements({action.page})", diff=False)
+
+            return self.build_action_result(
+                True,
+                f"Listed the elements around page {action.page}",
+                dom_state,
+                screenshot,
+                elements,
+                metadata,
+                error="",
+                content=None
+            )
+        except Exception as e:
+            return self.build_action_result(
+                False,
+                str(e),
+                None,
+                "",
+                "",
+                {},
+                error=str(e),
+                content=None
+            )
+
     # Dropdown Actions
 
     async def get_dropdown_options(self, index: int = Body(...)):
@@ -1661,22 +1985,22 @@ class BrowserAutomation:
 
             # Try to get the options - in a real implementation, we would use appropriate selectors
             try:
+                dropdown = self.element_locator(page, index).first
                 if element.tag_name.lower() == 'select':
                     # For <select> elements, get options using JavaScript
-                    options_js = f"""
-                    Array.from(document.querySelectorAll('select')[{index - 1}].options)
+                    options = await dropdown.evaluate("""
+                    select => Array.from(select.options)
                         .map((option, index) => ({
-                    index: index,
+                            index: index,
                             text: option.text,
                             value: option.value
-                        }));
-                    """
-                    options = await page.evaluate(options_js)
+                        }))
+                    """)
                 else:
                     # For other dropdown types, try to get options using a more generic approach
                     # Example for custom dropdowns - would need refinement in real implementation
-                    await page.click(f"#{element.attributes.get('id')}") if element.attributes.get('id') else None
-                    await page.wait_for_timeout(500)
+                    await dropdown.click()
+                    await self.wait_for_stable(page)
 
                     options_js = """
                     Array.from(document.querySelectorAll('.dropdown-item, [role="option"], li'))
@@ -1747,30 +2071,22 @@ class BrowserAutomation:
                 )
 
             element = selector_map[index]
+            dropdown = self.element_locator(page, index).first
 
             # Try to select the option - implementation varies by dropdown type
             if element.tag_name.lower() == 'select':
                 # For standard <select> elements
-                selector = f"select option:has-text('{option_text}')"
-                await page.select_option(
-                    f"#{element.attributes.get('id')}" if element.attributes.get('id') else f"//select[{index}]",
-                    label=option_text
-                )
+                await dropdown.select_option(label=option_text)
+                self.dom_snapshots.pop(page, None)
             else:
                 # For custom dropdowns
                 # First click to open the dropdown
-                if element.attributes.get('id'):
-                    await page.click(f"#{element.attributes.get('id')}")
-                else:
-                    await page.click(f"//{element.tag_name}[{index}]")
-
-                await page.wait_for_timeout(500)
+                await dropdown.click()
+                await self.wait_for_stable(page)
 
                 # Then try to click the option
                 await page.click(f"text={option_text}")
 
-            await page.wait_for_timeout(500)
-
             # Get updated state after action
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
                 f"select_dropdown_option({index}, '{option_text}')")
@@ -1886,6 +2202,52 @@ class BrowserAutomation:
 
     # Direct State Access API
 
+    async def capture_screen(self, ocr: bool = Body(True), include_screenshot: bool = Body(False)):
+        """Screenshot the current viewport on demand, optionally with its OCR text
+        Captures are reused until the page navigates or its DOM fingerprint (mutations, scroll, viewport) changes.
+        Failed screenshots are not cached, and failed OCR is retried on the next call.
+        """
+        try:
+            page = await self.get_current_page()
+            dom_state = await self.get_current_dom_state()
+            snapshot = self.dom_snapshots.get(page)
+            key = (page, self.navigations.get(page, 0), tuple(snapshot[0])) if snapshot is not None else None
+
+            capture = self.screen_captures.get(key) if key is not None else None
+            if capture is None:
+                capture = {'screenshot': await self.take_screenshot(), 'ocr_text': None}
+                if key is not None and capture['screenshot']:
+                    self.screen_captures[key] = capture
+                    if len(self.screen_captures) > self.max_screen_captures:
+                        self.screen_captures.popitem(last=False)
+            elif key is not None:
+                self.screen_captures.move_to_end(key)
+
+            if ocr and capture['ocr_text'] is None:
+                capture['ocr_text'] = await self.extract_ocr_text_from_screenshot(capture['screenshot'])
+
+            return self.build_action_result(
+                bool(capture['screenshot']),
+                "Captured the current viewport" if capture['screenshot'] else "Failed to capture the current viewport",
+                dom_state,
+                capture['screenshot'] if include_screenshot else "",
+                "",
+                {'ocr_text': capture['ocr_text'] or ""},
+                error="" if capture['screenshot'] else "Screenshot failed",
+                content=None
+            )
+        except Exception as e:
+            return self.build_action_result(
+                False,
+                str(e),
+                None,
+                "",
+                "",
+                {},
+                error=str(e),
+                content=None
+            )
+
     async def get_browser_state(self):
         """Direct API endpoint to get the current browser state
         This allows external services to retrieve the current state of the browser
@@ -1894,7 +2256,7 @@ class BrowserAutomation:
         try:
             # Get current browser state
             dom_state, screenshot, elements, metadata = await self.get_updated_browser_state(
-                "get_browser_state_api_call")
+                "get_browser_state_api_call", diff=False)
 
             return self.build_action_result(
                 True,
@@ -1940,6 +2302,7 @@ async def test_browser_api():
         # Initialize browser automation
         print("\n=== Starting Browser Automation Test ===")
         await automation_service.startup()
+        await automation_service.open_session("default")
         print("✅ Browser started successfully")
 
         # Navigate to a test page with interactive elements
@@ -2100,6 +2463,7 @@ async def test_browser_api_2():
         # Initialize browser automation
         print("\n=== Starting Browser Automation Test 2 (Chess Page) ===")
         await automation_service.startup()
+        await automation_service.open_session("default")
         print("✅ Browser started successfully")
 
         # Navigate to the chess test page
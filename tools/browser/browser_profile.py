@@ -0,0 +1,83 @@
+import os
+from dataclasses import dataclass
+from typing import FrozenSet, Tuple
+from urllib.parse import urlparse
+
+# Resource types that carry nothing the agent reads
+HEAVY_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+# Ad and analytics hosts, matched together with their subdomains
+TRACKER_DOMAINS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "adservice.google.com",
+    "amazon-adsystem.com",
+    "adnxs.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "hotjar.com",
+    "mixpanel.com",
+    "segment.io",
+    "connect.facebook.net",
+    "ads-twitter.com",
+    "bat.bing.com",
+)
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() == "true"
+
+
+@dataclass
+class BrowserProfile:
+    """How the browser is launched and which requests its pages may make"""
+    headless: bool = False
+    block_resources: bool = False
+    javascript_enabled: bool = True
+    viewport_width: int = 1024
+    viewport_height: int = 768
+    blocked_resource_types: FrozenSet[str] = HEAVY_RESOURCE_TYPES
+    blocked_domains: Tuple[str, ...] = TRACKER_DOMAINS
+
+    @classmethod
+    def from_env(cls) -> "BrowserProfile":
+        return cls(headless=_env_flag("BROWSER_HEADLESS", "false"),
+                   block_resources=_env_flag("BROWSER_BLOCK_RESOURCES", "false"),
+                   javascript_enabled=_env_flag("BROWSER_JAVASCRIPT", "true"))
+
+    def launch_options(self) -> dict:
+        return {"headless": self.headless}
+
+    def context_options(self) -> dict:
+        return {
+            "viewport": {'width': self.viewport_width, 'height': self.viewport_height},
+            "java_script_enabled": self.javascript_enabled,
+        }
+
+    def is_blocked(self, resource_type: str, url: str) -> bool:
+        if resource_type in self.blocked_resource_types:
+            return True
+
+        host = urlparse(url).hostname or ""
+        return any(host == domain or host.endswith(f".{domain}") for domain in self.blocked_domains)
+
+    async def apply(self, context):
+        """Install the request filter on a browser context; without blocking, requests are not intercepted at all"""
+        if not self.block_resources:
+            return
+
+        async def handle_route(route):
+            request = route.request
+            if self.is_blocked(request.resource_type, request.url):
+                await route.abort()
+            else:
+                await route.continue_()
+
+        await context.route("**/*", handle_route)
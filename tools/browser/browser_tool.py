@@ -1,17 +1,19 @@
-from typing import Annotated
+from typing import Annotated, TYPE_CHECKING
 
-import requests
 from loguru import logger
-from playwright.sync_api import Browser, BrowserContext, Page
 
 from tools.browser.cls import *
+from tools.browser.transport import get_transport
 from tools.util import sisyphus_tool, sisyphus_register
 
+if TYPE_CHECKING:
+    from playwright.sync_api import Browser, BrowserContext, Page
+
 
 class BrowserTool:
-    browser: Browser = None
-    browser_context: BrowserContext = None
-    pages: List[Page] = []
+    browser: "Browser" = None
+    browser_context: "BrowserContext" = None
+    pages: List["Page"] = []
     current_page_index: int = 0
     include_attributes = ["id", "href", "src", "alt", "aria-label", "placeholder", "name", "role", "title",
                           "value"]
@@ -124,6 +126,22 @@ class BrowserTool:
         logger.debug(f"Closing tab: {page_id}\033[0m")
         return self._execute_browser_action("close_tab", {"page_id": page_id})
 
+    @sisyphus_tool
+    def browser_extract_content(self, goal: Annotated[str, "What you are looking for on the page"],
+                                chunk: Annotated[int, "Which chunk to read, 0 being the most relevant one"] = 0) -> str:
+        """Read the main text content of the current page, skipping navigation and other boilerplate.
+        Long pages are split into chunks ranked by relevance to the goal; read further chunks when needed.
+
+        Args:
+            goal (str): What you are looking for on the page
+            chunk (int, optional): Which chunk to read, 0 being the most relevant one. Defaults to 0.
+
+        Returns:
+            dict: Result of the execution, with the text in content
+        """
+        logger.debug(f"Extracting content for: {goal} (chunk {chunk})\033[0m")
+        return self._execute_browser_action("extract_content", {"goal": goal, "chunk": chunk})
+
     @sisyphus_tool
     def browser_scroll_down(self, amount: Annotated[
         int, "Pixel amount to scroll (if not specified, scrolls one page)"] = None) -> str:
@@ -177,6 +195,21 @@ class BrowserTool:
         logger.debug(f"Scrolling to text: {text}\033[0m")
         return self._execute_browser_action("scroll_to_text", {"text": text})
 
+    @sisyphus_tool
+    def browser_list_elements(self, page: Annotated[
+        int, "Page of the document to list, counted in viewport heights from the top"]) -> str:
+        """List the interactive elements on another part of a long page without scrolling there.
+        Browser states only list the elements near the viewport and count the others per page.
+
+        Args:
+            page (int): Page of the document to list, counted in viewport heights from the top
+
+        Returns:
+            dict: Result of the execution
+        """
+        logger.debug(f"Listing elements of page {page}\033[0m")
+        return self._execute_browser_action("list_elements", {"page": page})
+
     @sisyphus_tool
     def browser_get_dropdown_options(self,
                                      index: Annotated[int, "The index of the dropdown element"]) -> str:
@@ -205,7 +238,7 @@ class BrowserTool:
             dict: Result of the execution
         """
         logger.debug(f"Selecting option '{text}' from dropdown with index: {index}\033[0m")
-        return self._execute_browser_action("select_dropdown_option", {"index": index, "text": text})
+        return self._execute_browser_action("select_dropdown_option", {"index": index, "option_text": text})
 
     @sisyphus_tool
     def browser_drag_drop(self,
@@ -271,30 +304,25 @@ class BrowserTool:
         logger.debug(f"Getting browser state\033[0m")
         return self._execute_browser_action("get_browser_state", method="GET")
 
+    @sisyphus_tool
+    def browser_read_screen(self) -> str:
+        """Read the text visible in the current viewport with OCR. Use it for text rendered in images or canvases that does not show up in the page elements
+
+        Returns:
+            dict: Result of the execution, with the recognized text in ocr_text
+        """
+        logger.debug(f"Reading screen text\033[0m")
+        return self._execute_browser_action("capture_screen", {"ocr": True})
+
     def _execute_browser_action(self, endpoint: str, params: dict = None, method: str = "POST") -> str:
-        """Execute a browser automation action through the API
+        """Execute a browser automation action through the configured transport
 
         Args:
-            endpoint (str): The API endpoint to call
-            params (dict, optional): Parameters to send. Defaults to None.
-            method (str, optional): HTTP method to use. Defaults to "POST".
+            endpoint (str): The browser action to run
+            params (dict, optional): Parameters of the action. Defaults to None.
+            method (str, optional): HTTP method to use in HTTP mode. Defaults to "POST".
 
         Returns:
             str: Result of the execution
         """
-        url = f"http://localhost:8000/api/automation/{endpoint}"
-
-        headers = {
-            'Content-Type': 'application/json'
-        }
-
-        if method == "GET" and params:
-            response = requests.get(url, params=params, headers=headers, timeout=30)
-        else:
-            json_data = params if params else None
-            response = requests.request(method, url, json=json_data, headers=headers, timeout=30)
-
-        response.raise_for_status()
-        logger.debug("Browser automation request completed successfully")
-
-        return response.text
+        return get_transport().execute(endpoint, params, method)
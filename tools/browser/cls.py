@@ -1,9 +1,8 @@
 from dataclasses import dataclass, field
-from functools import cached_property
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 
 
-@dataclass
+@dataclass(slots=True)
 class CoordinateSet:
     x: int = 0
     y: int = 0
@@ -11,7 +10,7 @@ class CoordinateSet:
     height: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class ViewportInfo:
     width: int = 0
     height: int = 0
@@ -19,7 +18,7 @@ class ViewportInfo:
     scroll_y: int = 0
 
 
-@dataclass
+@dataclass(slots=True)
 class HashedDomElement:
     tag_name: str
     attributes: Dict[str, str]
@@ -27,13 +26,13 @@ class HashedDomElement:
     page_coordinates: Optional[CoordinateSet] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DOMBaseNode:
     is_visible: bool
     parent: Optional['DOMElementNode'] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class DOMTextNode(DOMBaseNode):
     text: str = field(default="")
     type: str = 'TEXT_NODE'
@@ -47,7 +46,7 @@ class DOMTextNode(DOMBaseNode):
         return False
 
 
-@dataclass
+@dataclass(slots=True)
 class DOMElementNode(DOMBaseNode):
     tag_name: str = field(default="")
     xpath: str = field(default="")
@@ -62,6 +61,8 @@ class DOMElementNode(DOMBaseNode):
     viewport_coordinates: Optional[CoordinateSet] = None
     page_coordinates: Optional[CoordinateSet] = None
     viewport_info: Optional[ViewportInfo] = None
+    # Slots leave no instance dict for cached_property, so the hash is memoized here
+    _hash: Optional[HashedDomElement] = field(default=None, init=False, repr=False, compare=False)
 
     def __repr__(self) -> str:
         tag_str = f'<{self.tag_name}'
@@ -82,14 +83,16 @@ class DOMElementNode(DOMBaseNode):
 
         return tag_str
 
-    @cached_property
+    @property
     def hash(self) -> HashedDomElement:
-        return HashedDomElement(
-            tag_name=self.tag_name,
-            attributes=self.attributes,
-            is_visible=self.is_visible,
-            page_coordinates=self.page_coordinates
-        )
+        if self._hash is None:
+            self._hash = HashedDomElement(
+                tag_name=self.tag_name,
+                attributes=self.attributes,
+                is_visible=self.is_visible,
+                page_coordinates=self.page_coordinates
+            )
+        return self._hash
 
     def get_all_text_till_next_clickable_element(self, max_depth: int = -1) -> str:
         text_parts = []
@@ -98,7 +101,7 @@ class DOMElementNode(DOMBaseNode):
             if max_depth != -1 and current_depth > max_depth:
                 return
 
-            if isinstance(node, DOMElementNode) and node != self and node.highlight_index is not None:
+            if isinstance(node, DOMElementNode) and node is not self and node.highlight_index is not None:
                 return
 
             if isinstance(node, DOMTextNode):
@@ -111,63 +114,77 @@ class DOMElementNode(DOMBaseNode):
         return '\n'.join(text_parts).strip()
 
     def clickable_elements_to_string(self, include_attributes: list[str] | None = None) -> str:
-        """Convert the processed DOM content to HTML."""
+        """Convert the processed DOM content to HTML.
+
+        The tree is walked once. Text below a highlighted element is collected for that element on the way
+        down, and its line is filled in once its subtree is done.
+        """
         formatted_text = []
 
-        def process_node(node: DOMBaseNode, depth: int) -> None:
+        # Entries are (node, text parts of the nearest highlighted ancestor) or (line slot, node, text parts)
+        stack: list = [(self, None)]
+        while stack:
+            entry = stack.pop()
+            if len(entry) == 3:
+                slot, node, text_parts = entry
+                formatted_text[slot] = node._clickable_line('\n'.join(text_parts).strip(), include_attributes)
+                continue
+
+            node, collector = entry
             if isinstance(node, DOMElementNode):
-                # Add element with highlight_index
                 if node.highlight_index is not None:
-                    attributes_str = ''
-                    text = node.get_all_text_till_next_clickable_element()
-
-                    # Process attributes for display
-                    display_attributes = []
-                    if include_attributes:
-                        for key, value in node.attributes.items():
-                            if key in include_attributes and value and value != node.tag_name:
-                                if text and value in text:
-                                    continue  # Skip if attribute value is already in the text
-                                display_attributes.append(str(value))
-
-                    attributes_str = ';'.join(display_attributes)
-
-                    # Build the element string
-                    line = f'[{node.highlight_index}]<{node.tag_name}'
-
-                    # Add important attributes for identification
-                    for attr_name in ['id', 'href', 'name', 'value', 'type']:
-                        if attr_name in node.attributes and node.attributes[attr_name]:
-                            line += f' {attr_name}="{node.attributes[attr_name]}"'
-
-                    # Add the text content if available
-                    if text:
-                        line += f'> {text}'
-                    elif attributes_str:
-                        line += f'> {attributes_str}'
-                    else:
-                        # If no text and no attributes, use the tag name
-                        line += f'> {node.tag_name.upper()}'
-
-                    line += ' </>'
-                    formatted_text.append(line)
+                    # Reserve the element's line, its text is known once the subtree is processed
+                    collector = []
+                    stack.append((len(formatted_text), node, collector))
+                    formatted_text.append(None)
 
                 # Process children regardless
-                for child in node.children:
-                    process_node(child, depth + 1)
+                for child in reversed(node.children):
+                    stack.append((child, collector))
 
             elif isinstance(node, DOMTextNode):
+                if collector is not None:
+                    collector.append(node.text)
                 # Add text only if it doesn't have a highlighted parent
-                if not node.has_parent_with_highlight_index() and node.is_visible:
-                    if node.text and node.text.strip():
-                        formatted_text.append(node.text)
+                elif node.is_visible and node.text and node.text.strip():
+                    formatted_text.append(node.text)
 
-        process_node(self, 0)
         result = '\n'.join(formatted_text)
         return result if result.strip() else "No interactive elements found"
 
+    def _clickable_line(self, text: str, include_attributes: list[str] | None) -> str:
+        # Process attributes for display
+        display_attributes = []
+        if include_attributes:
+            for key, value in self.attributes.items():
+                if key in include_attributes and value and value != self.tag_name:
+                    if text and value in text:
+                        continue  # Skip if attribute value is already in the text
+                    display_attributes.append(str(value))
+
+        attributes_str = ';'.join(display_attributes)
+
+        # Build the element string
+        line = f'[{self.highlight_index}]<{self.tag_name}'
 
-@dataclass
+        # Add important attributes for identification
+        for attr_name in ['id', 'href', 'name', 'value', 'type']:
+            if attr_name in self.attributes and self.attributes[attr_name]:
+                line += f' {attr_name}="{self.attributes[attr_name]}"'
+
+        # Add the text content if available
+        if text:
+            line += f'> {text}'
+        elif attributes_str:
+            line += f'> {attributes_str}'
+        else:
+            # If no text and no attributes, use the tag name
+            line += f'> {self.tag_name.upper()}'
+
+        return line + ' </>'
+
+
+@dataclass(slots=True)
 class DOMState:
     element_tree: DOMElementNode
     selector_map: Dict[int, DOMElementNode]
@@ -175,3 +192,8 @@ class DOMState:
     title: str = ""
     pixels_above: int = 0
     pixels_below: int = 0
+    viewport_info: Optional[ViewportInfo] = None
+    # Elements left out of a windowed scan, counted per viewport-sized page of the document
+    offscreen_elements: Dict[int, int] = field(default_factory=dict)
+    # Vertical page range (top, bottom) a windowed scan read elements from, None when it read the whole page
+    scan_window: Optional[Tuple[float, float]] = None
@@ -0,0 +1,57 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+from tools.browser.serializer import STOPWORDS
+
+
+def tokenize(text: str) -> List[str]:
+    return [term for term in re.findall(r"\w+", text.lower()) if len(term) > 1 and term not in STOPWORDS]
+
+
+def chunk_blocks(blocks: List[str], chunk_chars: int) -> List[str]:
+    """Group text blocks into chunks of about `chunk_chars` characters, splitting only blocks longer than a chunk"""
+    chunks, current, size = [], [], 0
+    for block in blocks:
+        pieces = [block[i:i + chunk_chars] for i in range(0, len(block), chunk_chars)] or [block]
+        for piece in pieces:
+            if current and size + len(piece) > chunk_chars:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 2
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def bm25_scores(documents: List[str], query: str, k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """Okapi BM25 score of each document for the query"""
+    terms = set(tokenize(query))
+    tokenized = [tokenize(document) for document in documents]
+    if not terms or not tokenized:
+        return [0.0] * len(documents)
+
+    average_length = sum(len(tokens) for tokens in tokenized) / len(tokenized) or 1
+    document_frequency = Counter(term for tokens in tokenized for term in set(tokens) & terms)
+
+    scores = []
+    for tokens in tokenized:
+        frequencies = Counter(tokens)
+        score = 0.0
+        for term in terms:
+            frequency = frequencies[term]
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(tokenized) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * len(tokens) / average_length))
+        scores.append(score)
+    return scores
+
+
+def rank_chunks(chunks: List[str], goal: str) -> List[int]:
+    """Chunk positions, most relevant to the goal first; page order when nothing matches"""
+    scores = bm25_scores(chunks, goal)
+    return sorted(range(len(chunks)), key=lambda position: (-scores[position], position))
@@ -0,0 +1,26 @@
+"""OCR of screen captures with the tesseract command line tool.
+
+Each image is read by its own tesseract process, so OCR neither blocks the event loop nor needs Python worker
+processes, which would import this package and re-run the entry point before doing any work.
+"""
+import asyncio
+import os
+
+TESSERACT_CMD = os.getenv("TESSERACT_CMD", "tesseract")
+
+
+async def ocr_image(image_bytes: bytes, timeout: float = 60) -> str:
+    """Extract the text of an encoded image (PNG or JPEG)"""
+    process = await asyncio.create_subprocess_exec(
+        TESSERACT_CMD, "stdin", "stdout",
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(image_bytes), timeout)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        process.kill()
+        await process.wait()
+        raise
+
+    if process.returncode != 0:
+        raise RuntimeError(f"tesseract exited with {process.returncode}: {stderr.decode(errors='replace').strip()}")
+    return stdout.decode("utf-8", errors="replace").strip()
@@ -0,0 +1,66 @@
+import re
+from typing import Dict, List, Optional, Set
+
+from tools.browser.cls import DOMElementNode
+
+# Attributes whose values describe what an element is for
+DESCRIPTIVE_ATTRIBUTES = ["aria-label", "placeholder", "title", "alt", "name", "value", "href"]
+
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "from", "into", "what", "which", "who", "how", "are", "was",
+    "were", "you", "your", "can", "please", "find", "about", "all", "any", "get", "use", "www", "http", "https",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # Same 4 characters per token heuristic as the message compression
+    return len(text) // 4 + 1
+
+
+def goal_terms(goal: str) -> Set[str]:
+    return {term for term in re.findall(r"\w+", goal.lower()) if len(term) > 2 and term not in STOPWORDS}
+
+
+def relevance(element: DOMElementNode, text: str, terms: Set[str]) -> int:
+    """Number of goal terms found in the element's text and descriptive attributes"""
+    if not terms:
+        return 0
+
+    described = " ".join([text] + [element.attributes.get(name, "") for name in DESCRIPTIVE_ATTRIBUTES])
+    return len(terms & set(re.findall(r"\w+", described.lower())))
+
+
+def serialize_elements(selector_map: Dict[int, DOMElementNode], token_budget: int, goal: Optional[str] = None,
+                       include_attributes: Optional[List[str]] = None, max_text_length: int = 120) -> str:
+    """Render as many interactive elements as fit into `token_budget`.
+
+    Elements in the viewport come first, then those most relevant to the goal; the chosen ones are listed in
+    page order with their text cut to `max_text_length` characters.
+    """
+    terms = goal_terms(goal or "")
+
+    candidates = []
+    for position, element in enumerate(selector_map.values()):
+        text = element.get_all_text_till_next_clickable_element()
+        if len(text) > max_text_length:
+            text = text[:max_text_length].rstrip() + "..."
+        line = element._clickable_line(text, include_attributes)
+        rank = (not element.is_in_viewport, -relevance(element, text, terms), position)
+        candidates.append((rank, position, line))
+
+    chosen = []
+    used_tokens = 0
+    for rank, position, line in sorted(candidates):
+        tokens = estimate_tokens(line)
+        if used_tokens + tokens > token_budget:
+            continue
+        used_tokens += tokens
+        chosen.append((position, line))
+
+    lines = [line for _, line in sorted(chosen)]
+    omitted = len(candidates) - len(chosen)
+    if omitted:
+        lines.append(f"... {omitted} more elements not shown to stay within the token budget, "
+                     f"scroll or use browser_scroll_to_text to bring them into view")
+
+    return "\n".join(lines) if lines else "No interactive elements found"
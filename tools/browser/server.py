@@ -0,0 +1,99 @@
+import threading
+import time
+from urllib.parse import unquote, urlparse
+
+import requests
+from loguru import logger
+
+# Address of the local browser API; BROWSER_API_URL can point the http transport at a remote one instead
+API_URL = "http://localhost:8000/api"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "0.0.0.0", "::1"}
+# Agent session an action belongs to; each session gets its own browser context
+SESSION_HEADER = "X-Sisyphus-Session"
+# Task of the agent run, URL-quoted
+GOAL_HEADER = "X-Sisyphus-Goal"
+
+_server_thread = None
+_server_lock = threading.Lock()
+
+
+def _create_app():
+    # FastAPI and Playwright are only imported once the browser is actually needed
+    from fastapi import FastAPI, Request
+
+    from tools.browser.browser_api import BrowserAutomation
+
+    # Create singleton instance
+    automation_service = BrowserAutomation()
+
+    # Create API app
+    api_app = FastAPI()
+
+    @api_app.get("/api")
+    async def health_check():
+        return {"status": "ok", "message": "API server is running"}
+
+    @api_app.middleware("http")
+    async def bind_session(request: Request, call_next):
+        if not request.url.path.startswith("/api/automation"):
+            return await call_next(request)
+
+        async with automation_service.session_scope(request.headers.get(SESSION_HEADER, "default"),
+                                                     unquote(request.headers.get(GOAL_HEADER, ""))):
+            return await call_next(request)
+
+    api_app.include_router(automation_service.router, prefix="/api")
+    return api_app
+
+
+def is_local(api_url: str) -> bool:
+    """Whether the browser API at `api_url` is the one this process serves"""
+    return (urlparse(api_url).hostname or "") in LOCAL_HOSTS
+
+
+def start_uvicorn_thread(port: int = 8000):
+    """Start uvicorn server in a separate thread (alternative approach)."""
+    global _server_thread
+
+    if _server_thread is not None and _server_thread.is_alive():
+        logger.info("Uvicorn server thread already running")
+        return
+
+    api_app = _create_app()
+
+    def run_server():
+        try:
+            import uvicorn
+
+            logger.info("Starting uvicorn server in thread...")
+            uvicorn.run(api_app, host="0.0.0.0", port=port, log_level="info")
+        except Exception as e:
+            logger.error(f"Error in uvicorn server thread: {e}")
+
+    _server_thread = threading.Thread(target=run_server, daemon=True)
+    _server_thread.start()
+    logger.info("Uvicorn server thread started")
+
+
+def ensure_server(api_url: str = API_URL, timeout: float = 120):
+    """Start the local browser API on first use and wait until it serves requests at `api_url`.
+
+    The browser is launched by the server's startup hook, so the health check only answers once it is ready.
+    """
+    with _server_lock:
+        if _server_thread is not None and _server_thread.is_alive():
+            return
+
+        start_uvicorn_thread(urlparse(api_url).port or 8000)
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                if requests.get(api_url, timeout=1).ok:
+                    logger.info("Browser API is ready")
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+
+        raise RuntimeError(f"Browser API did not become ready within {timeout}s")
@@ -0,0 +1,144 @@
+import asyncio
+import inspect
+import os
+import threading
+from typing import Optional
+from urllib.parse import quote
+
+import requests
+from loguru import logger
+from pydantic import BaseModel
+from requests.adapters import HTTPAdapter
+
+from tools.browser.server import API_URL, GOAL_HEADER, SESSION_HEADER, ensure_server, is_local
+from tools.util import current_goal, current_session
+
+
+class InProcessTransport:
+    """Call BrowserAutomation directly on a dedicated event loop thread, without going through HTTP"""
+    loop: Optional[asyncio.AbstractEventLoop]
+
+    def __init__(self, startup_timeout: float = 120, action_timeout: float = 60):
+        self.startup_timeout = startup_timeout
+        self.action_timeout = action_timeout
+        self.loop = None
+        self.automation = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self.automation is not None:
+                return
+
+            from tools.browser.browser_api import BrowserAutomation
+
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="browser-loop", daemon=True).start()
+
+            automation = BrowserAutomation()
+            asyncio.run_coroutine_threadsafe(automation.startup(), loop).result(self.startup_timeout)
+            logger.info("Browser is ready")
+
+            self.loop = loop
+            self.automation = automation
+
+    async def _call(self, session_id: str, goal: str, endpoint: str, params: dict):
+        action = getattr(self.automation, endpoint)
+        parameters = list(inspect.signature(action).parameters.values())
+
+        async with self.automation.session_scope(session_id, goal):
+            # Actions taking a single action model get it built from the params, the others take them as keywords
+            if len(parameters) == 1 and inspect.isclass(parameters[0].annotation) \
+                    and issubclass(parameters[0].annotation, BaseModel):
+                return await action(parameters[0].annotation(**params))
+            return await action(**params)
+
+    def execute(self, endpoint: str, params: dict = None, method: str = "POST") -> str:
+        self._ensure_started()
+        # The browser loop does not see the caller's context, so the session is handed over explicitly
+        future = asyncio.run_coroutine_threadsafe(self._call(current_session.get(), current_goal.get(), endpoint, params or {}),
+                                                  self.loop)
+        try:
+            result = future.result(self.action_timeout)
+        except TimeoutError:
+            # Cancelling the action also releases its session
+            future.cancel()
+            raise TimeoutError(f"Browser action {endpoint} did not finish within {self.action_timeout}s")
+        logger.debug("Browser automation action completed successfully")
+
+        return result.model_dump_json()
+
+    def release(self, session_id: str):
+        # Without a browser there is no session to release
+        if self.automation is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.automation.release_session(session_id), self.loop) \
+            .result(self.action_timeout)
+
+
+class HttpTransport:
+    """Send browser actions to the browser API server at `api_url`. Unless `start_server` says otherwise, a local
+    server is started in a background thread on first use and a remote one is expected to be running already.
+
+    Requests share one keep-alive session, so concurrent tool calls reuse pooled connections.
+    """
+    session: requests.Session
+
+    def __init__(self, api_url: str = API_URL, pool_size: int = 10, connect_timeout: float = 5,
+                 read_timeout: float = 30, start_server: Optional[bool] = None):
+        self.api_url = api_url.rstrip("/")
+        self.start_server = is_local(self.api_url) if start_server is None else start_server
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update({'Content-Type': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Set by the first action; before it no session can exist and a local server may not be running
+        self.used = False
+
+    def execute(self, endpoint: str, params: dict = None, method: str = "POST") -> str:
+        if self.start_server:
+            ensure_server(self.api_url)
+        self.used = True
+        url = f"{self.api_url}/automation/{endpoint}"
+        # Header values must be latin-1, the goal is free text
+        headers = {SESSION_HEADER: current_session.get(), GOAL_HEADER: quote(current_goal.get())}
+
+        if method == "GET" and params:
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        else:
+            json_data = params if params else None
+            response = self.session.request(method, url, json=json_data, headers=headers, timeout=self.timeout)
+
+        response.raise_for_status()
+        logger.debug("Browser automation request completed successfully")
+
+        return response.text
+
+    def release(self, session_id: str):
+        if not self.used:
+            return
+        response = self.session.post(f"{self.api_url}/sessions/{quote(session_id, safe='')}/release",
+                                     timeout=self.timeout)
+        response.raise_for_status()
+
+
+_transport = None
+_transport_lock = threading.Lock()
+
+
+def get_transport():
+    """The transport selected by BROWSER_TRANSPORT: "inprocess" (default) or "http" """
+    global _transport
+
+    with _transport_lock:
+        if _transport is None:
+            if os.getenv("BROWSER_TRANSPORT", "inprocess").lower() == "http":
+                _transport = HttpTransport(api_url=os.getenv("BROWSER_API_URL", API_URL),
+                                           pool_size=int(os.getenv("BROWSER_HTTP_POOL_SIZE", "10")),
+                                           connect_timeout=float(os.getenv("BROWSER_HTTP_CONNECT_TIMEOUT", "5")),
+                                           read_timeout=float(os.getenv("BROWSER_HTTP_READ_TIMEOUT", "30")))
+            else:
+                _transport = InProcessTransport(action_timeout=float(os.getenv("BROWSER_ACTION_TIMEOUT", "60")))
+        return _transport
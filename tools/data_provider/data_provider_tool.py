@@ -1,6 +1,7 @@
 import json
 from typing import Union, Dict, Any, Annotated
 
+from tools.data_provider.base import RapidDataProviderBase
 from tools.data_provider.linkedin import LinkedinProvider
 from tools.data_provider.twitter import TwitterProvider
 from tools.util import sisyphus_tool, sisyphus_register
@@ -9,11 +10,18 @@ from tools.util import sisyphus_tool, sisyphus_register
 class DataProvidersTool:
     def __init__(self):
         self.register_data_providers = {
-            "linkedin": LinkedinProvider(),
-            "twitter": TwitterProvider(),
+            "linkedin": LinkedinProvider,
+            "twitter": TwitterProvider,
         }
+        self.data_providers: Dict[str, RapidDataProviderBase] = {}
         sisyphus_register(self)
 
+    def _get_data_provider(self, service_name: str) -> RapidDataProviderBase:
+        # Providers are constructed on their first call
+        if service_name not in self.data_providers:
+            self.data_providers[service_name] = self.register_data_providers[service_name]()
+        return self.data_providers[service_name]
+
     @sisyphus_tool
     def get_data_provider_endpoints(
             self,
@@ -31,7 +39,7 @@ class DataProvidersTool:
             if service_name not in self.register_data_providers:
                 return f"Data provider '{service_name}' not found. Available data providers: {list(self.register_data_providers.keys())}"
 
-            endpoints = self.register_data_providers[service_name].get_endpoints()
+            endpoints = self._get_data_provider(service_name).get_endpoints()
             return endpoints
 
         except Exception as e:
@@ -70,7 +78,7 @@ class DataProvidersTool:
             if service_name not in self.register_data_providers:
                 return f"API '{service_name}' not found. Available APIs: {list(self.register_data_providers.keys())}"
 
-            data_provider = self.register_data_providers[service_name]
+            data_provider = self._get_data_provider(service_name)
 
             if endpoint not in data_provider.get_endpoints().keys():
                 return f"Endpoint '{endpoint}' not found in {service_name} data provider."
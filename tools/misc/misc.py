@@ -1,9 +1,7 @@
 from typing import Annotated
 
-import requests
-from loguru import logger
-
 from storage import storage
+from tools.browser.transport import get_transport
 from tools.util import sisyphus_register, sisyphus_tool
 
 
@@ -57,14 +55,4 @@ class MiscTool:
         input(f"{text}\nPress enter to continue...")
 
         ## 获取用户介入后的浏览器状态
-        url = f"http://localhost:8000/api/automation/get_browser_state"
-        headers = {
-            'Content-Type': 'application/json'
-        }
-
-        response = requests.get(url, params={}, headers=headers, timeout=30)
-
-        response.raise_for_status()
-        logger.debug("Browser automation request completed successfully")
-
-        return response.text
+        return get_transport().execute("get_browser_state", method="GET")
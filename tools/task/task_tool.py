@@ -3,7 +3,7 @@ import uuid
 from typing import Any, Dict, List, Literal, Annotated
 
 from storage import storage
-from tools.util import sisyphus_register, sisyphus_tool
+from tools.util import sisyphus_register, sisyphus_tool, current_session
 
 
 class Task:
@@ -38,6 +38,10 @@ class TaskTool:
     def __init__(self):
         sisyphus_register(self)
 
+    @staticmethod
+    def _sections_key() -> str:
+        return f"{current_session.get()}:sections"
+
     @sisyphus_tool
     def create_tasks(self, sections: List[Dict[str, Any]]):
         """
@@ -132,7 +136,7 @@ class TaskTool:
                 target_section.tasks.append(new_task)
             created_sections.append(target_section)
 
-        storage.set_value("sections", created_sections)
+        storage.set_value(self._sections_key(), created_sections)
         return json.dumps({"status": "Success", "sections": [s.to_dict() for s in created_sections]})
 
     @sisyphus_tool
@@ -184,7 +188,7 @@ class TaskTool:
             ]
         }
         """
-        return json.dumps({"status": "Success", "sections": [s.to_dict() for s in storage.get_value("sections")]})
+        return json.dumps({"status": "Success", "sections": [s.to_dict() for s in storage.get_value(self._sections_key())]})
 
     @sisyphus_tool
     def update_task(self,
@@ -197,7 +201,7 @@ class TaskTool:
         """
         Update one or more tasks. EFFICIENT BATCHING: Before calling this tool, think about what tasks you have completed and batch them into a single update call. This is more efficient than making multiple consecutive update calls. Always execute tasks in the exact sequence they appear, but batch your updates when possible. Update task status to 'completed' after finishing each task, and consider batching multiple completed tasks into one call rather than updating them individually.
         """
-        current_sections = storage.get_value("sections")
+        current_sections = storage.get_value(self._sections_key())
 
         # section_map = [section.id for section in current_sections]
         # if section_id not in section_map:
@@ -210,6 +214,6 @@ class TaskTool:
                         task.status = status
                         current_sections[i].tasks[j] = task
 
-        storage.set_value("sections", current_sections)
+        storage.set_value(self._sections_key(), current_sections)
 
-        return json.dumps({"status": "Success", "sections": [s.to_dict() for s in storage.get_value("sections")]})
+        return json.dumps({"status": "Success", "sections": [s.to_dict() for s in storage.get_value(self._sections_key())]})
@@ -1,16 +1,48 @@
+import asyncio
+import functools
+import os
+from contextvars import ContextVar
 from dataclasses import dataclass
+from weakref import WeakKeyDictionary
 
-from langchain_core.tools import tool
+from langchain_core.tools import StructuredTool
 
 from tools import tool_registry
 
+# Session of the agent run calling a tool, so tools can keep per-agent data apart
+current_session: ContextVar[str] = ContextVar("current_session", default="default")
+
+# Task of the agent run calling a tool, so tools can tell what is relevant to it
+current_goal: ContextVar[str] = ContextVar("current_goal", default="")
+
+# One limiter per event loop, shared by every tool call running on it
+_tool_limiters: "WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = WeakKeyDictionary()
+
+
+def _tool_limiter() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    if loop not in _tool_limiters:
+        _tool_limiters[loop] = asyncio.Semaphore(int(os.getenv("TOOL_CONCURRENCY", "4")))
+    return _tool_limiters[loop]
 
-def sisyphus_register(instance):
-    for attr_name in dir(instance):
-        attr = getattr(instance, attr_name)
 
-        if hasattr(attr, '__sisyphus_tool__'):
-            raw_tool = tool(attr)
+def _async_tool(func):
+    """Run a blocking tool method in a worker thread, bounded by TOOL_CONCURRENCY"""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        async with _tool_limiter():
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    return wrapper
+
+
+def sisyphus_register(instance):
+    # Look tools up on the class so lazily initialized properties of the instance are not triggered
+    for attr_name in dir(type(instance)):
+        if hasattr(getattr(type(instance), attr_name, None), '__sisyphus_tool__'):
+            attr = getattr(instance, attr_name)
+            raw_tool = StructuredTool.from_function(func=attr, coroutine=_async_tool(attr))
             tool_registry.register(raw_tool)
 
 
@@ -1,21 +1,29 @@
 import json
-from typing import Annotated
+from functools import cached_property
+from typing import Annotated, TYPE_CHECKING
 
 from loguru import logger
-from tavily import TavilyClient
 
 from tools.util import sisyphus_register, sisyphus_tool
 
+if TYPE_CHECKING:
+    from tavily import TavilyClient
+
 
 class WebSearchTool:
     api_key: str
-    tavily_client: TavilyClient
 
     def __init__(self, api_key: str):
         self.api_key = api_key
-        self.tavily_client = TavilyClient(api_key=self.api_key)
         sisyphus_register(self)
 
+    @cached_property
+    def tavily_client(self) -> "TavilyClient":
+        # Created (and imported) on the first search rather than at startup
+        from tavily import TavilyClient
+
+        return TavilyClient(api_key=self.api_key)
+
     @sisyphus_tool
     def web_search(self,
                    query: Annotated[
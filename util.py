@@ -1,35 +1,146 @@
-from typing import List, Union, Literal
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Literal
 
 from langchain_core.messages import BaseMessage, ToolMessage, AIMessage, HumanMessage
 from langchain_core.messages.utils import count_tokens_approximately
 
 
-def compress_messages(messages: List[BaseMessage], max_tokens: int, single_msg_threshold: int,
-                      target: Union[str, Literal["tool", "ai", "human"]]) -> List[
-    BaseMessage]:
-    uncompressed_total_token_count = count_tokens_approximately(messages=messages)
+class TokenLedger:
+    """Per-message token counts for an append-only message history.
+
+    Counts are keyed by message id, so each message is tokenized once and the running
+    total only has to account for messages appended since the last sync.
+    """
+    counts: Dict[str, int]
+    order: List[str]
+    total: int
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = {}
+        self.order = []
+        self.total = 0
+
+    @staticmethod
+    def _key(msg: BaseMessage) -> str:
+        return msg.id or str(id(msg))
+
+    def sync(self, messages: List[BaseMessage]) -> int:
+        # History is append-only; anything else (a new conversation, a rewound checkpoint) starts over
+        known = len(self.order)
+        if known > len(messages) or (known and self._key(messages[known - 1]) != self.order[-1]):
+            self.reset()
+            known = 0
+
+        for msg in messages[known:]:
+            key = self._key(msg)
+            if key not in self.counts:
+                self.counts[key] = count_tokens_approximately(messages=[msg])
+            self.order.append(key)
+            self.total += self.counts[key]
+
+        return self.total
+
+    def count(self, msg: BaseMessage) -> int:
+        key = self._key(msg)
+        if key not in self.counts:
+            self.counts[key] = count_tokens_approximately(messages=[msg])
+        return self.counts[key]
+
+
+class CompressedViewCache:
+    """Compressed renderings of messages keyed by (message id, mode, budget).
+
+    The original messages stay intact in the state; once a message has been truncated for a given
+    budget, later steps reuse the rendering (and its token count) instead of slicing it again.
+    """
+    views: "OrderedDict[Tuple[str, str, int], Tuple[BaseMessage, int]]"
+    max_entries: int
+
+    def __init__(self, max_entries: int = 4096):
+        self.views = OrderedDict()
+        self.max_entries = max_entries
+
+    def render(self, msg: BaseMessage, mode: Literal["truncate", "compress"], budget: int,
+               ledger: TokenLedger) -> Tuple[BaseMessage, int]:
+        key = (TokenLedger._key(msg), mode, budget)
+        if key in self.views:
+            self.views.move_to_end(key)
+            return self.views[key]
+
+        if mode == "truncate":
+            compressed_msg = safe_truncate(msg, budget)
+        else:
+            compressed_msg = compress_message(msg, msg.id, budget)
+
+        if compressed_msg is msg:
+            view = (msg, ledger.count(msg))
+        else:
+            view = (compressed_msg, count_tokens_approximately(messages=[compressed_msg]))
+
+        self.views[key] = view
+        if len(self.views) > self.max_entries:
+            self.views.popitem(last=False)
+        return view
+
+
+COMPRESSION_TARGETS = {
+    "tool": ToolMessage,
+    "human": HumanMessage,
+    "ai": AIMessage,
+}
+
+
+def compress_messages(messages: List[BaseMessage], max_tokens: int,
+                      policy: Dict[Literal["tool", "ai", "human"], int],
+                      ledger: Optional[TokenLedger] = None,
+                      cache: Optional[CompressedViewCache] = None) -> List[BaseMessage]:
+    """Return a compressed view of the messages without touching the originals.
+
+    `policy` maps each target role to its single-message token threshold. Roles are compressed in
+    the policy's order until the history fits into `max_tokens`; the latest message of a role is
+    middle-truncated, older ones are cut short and can be recovered with the expand-message tool.
+    """
+    ledger = ledger or TokenLedger()
+    cache = cache or CompressedViewCache()
+    total_token_count = ledger.sync(messages)
     max_tokens_value = max_tokens or (100 * 1000)
 
-    if uncompressed_total_token_count > max_tokens_value:
-        _i = 0
-        for msg in reversed(messages):
-            if target == "tool":
-                cls = ToolMessage
-            if target == "ai":
-                cls = AIMessage
-            if target == "human":
-                cls = HumanMessage
-
-            if isinstance(msg, cls):
-                _i += 1
-                msg_token_count = count_tokens_approximately(messages=[msg])
-                if msg_token_count > single_msg_threshold:
-                    if _i > 1:
-                        compressed_msg = compress_message(msg, msg.id, single_msg_threshold * 3)
-                    else:
-                        compressed_msg = safe_truncate(msg, int(max_tokens_value * 2))
-                    msg.content = compressed_msg.content
-    return messages
+    view = list(messages)
+    if total_token_count <= max_tokens_value:
+        return view
+
+    # One scan over the history collects the oversized messages of every target role, newest first
+    candidates: Dict[str, List[Tuple[int, bool]]] = {target: [] for target in policy}
+    seen: Dict[str, int] = {target: 0 for target in policy}
+    for position in range(len(messages) - 1, -1, -1):
+        msg = messages[position]
+        for target, single_msg_threshold in policy.items():
+            if isinstance(msg, COMPRESSION_TARGETS[target]):
+                seen[target] += 1
+                if ledger.count(msg) > single_msg_threshold:
+                    candidates[target].append((position, seen[target] == 1))
+                break
+
+    for target, single_msg_threshold in policy.items():
+        if total_token_count <= max_tokens_value:
+            break
+
+        for position, is_latest in candidates[target]:
+            msg = messages[position]
+            if is_latest:
+                compressed_msg, token_count = cache.render(msg, "truncate", min(int(max_tokens_value * 2), 100000),
+                                                           ledger)
+            else:
+                compressed_msg, token_count = cache.render(msg, "compress", single_msg_threshold * 3, ledger)
+
+            if compressed_msg is not msg:
+                total_token_count += token_count - ledger.count(msg)
+                view[position] = compressed_msg
+
+    return view
 
 
 def safe_truncate(msg: BaseMessage, max_length: int = 100000) -> BaseMessage:
@@ -44,7 +155,7 @@ def safe_truncate(msg: BaseMessage, max_length: int = 100000) -> BaseMessage:
         end_part = msg.content[-end_length:] if end_length > 0 else ""
 
         truncated_content = start_part + f"\n\n... (middle truncated) ...\n\n" + end_part + f"\n\nThis message is too long, repeat relevant information in your response to remember it"
-        msg.content = truncated_content
+        return msg.model_copy(update={"content": truncated_content})
 
     return msg
 
@@ -53,6 +164,6 @@ def compress_message(msg: BaseMessage, message_id: str, max_length: int = 3000)
     if len(msg.content) > max_length:
         compressed_content = msg.content[
                              :max_length] + "... (truncated)" + f"\n\nmessage_id \"{message_id}\"\nUse expand-message tool to see contents"
-        msg.content = compressed_content
+        return msg.model_copy(update={"content": compressed_content})
 
-    return msg
\ No newline at end of file
+    return msg